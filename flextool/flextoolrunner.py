@@ -1,13 +1,22 @@
-import time
 import csv
+import json
+import hashlib
+import pickle
+import threading
+import time
+import re
 import math
 import subprocess
 import logging
 import copy
+import fnmatch
+import gzip
+import io
 import sys
 import os
 import xml.etree.ElementTree as ET
 import pandas as pd
+import numpy as np
 import shutil
 import spinedb_api as api
 from spinedb_api import DatabaseMapping
@@ -15,6 +24,20 @@ from spinedb_api import DatabaseMapping
 from pathlib import Path
 from collections import OrderedDict
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+# optional, used by the in-process HiGHS backend
+try:
+    import highspy
+    import swiglpk as glpk
+except ImportError:
+    highspy = None
+    glpk = None
+# optional, used to sample the memory use of glpsol and the solvers
+try:
+    import psutil
+except ImportError:
+    psutil = None
 
 
 #return_codes
@@ -28,8 +51,14 @@ class FlexToolRunner:
     Define Class to run the model and read and recreate the required config files:
     """
 
-    def __init__(self, input_db_url=None, scenario_name=None, flextool_dir=None, bin_dir=None, root_dir=None):
+    def __init__(self, input_db_url=None, scenario_name=None, flextool_dir=None, bin_dir=None, root_dir=None, value_cache_dir=None):
         self.logger = logging.getLogger(__name__)
+        # timings and memory use of the run, written to output/run_profile.csv and .json
+        self.profile = []
+        # status, objective, gap and iterations reported by the solver for each solve (roll)
+        self.solve_results = []
+        self.profile_solve = ""
+        start = time.perf_counter()
 #        logger.basicConfig(
 #            stream=sys.stderr,
 #            level=logging.DEBUG,
@@ -43,21 +72,39 @@ class FlexToolRunner:
         # make a directory for model unit tests
         if not os.path.exists("./tests"):
             os.makedirs("./tests")
-        if flextool_dir is None:
-            self.flextool_dir = Path(__file__).parent.parent / "flextool"
-        if bin_dir is None:
-            self.bin_dir = Path(__file__).parent.parent / "bin"
-        if root_dir is None:
-            self.root_dir = Path(__file__).parent.parent
+        # absolute paths, so that the runner can also work in another directory than the FlexTool root
+        self.flextool_dir = Path(flextool_dir or Path(__file__).resolve().parent.parent / "flextool")
+        self.bin_dir = Path(bin_dir or Path(__file__).resolve().parent.parent / "bin")
+        self.root_dir = Path(root_dir or Path(__file__).resolve().parent.parent)
+        # extra command line arguments for glpsol and cplex
+        self.solver_args = []
+        # solve highs problems with highspy in this process instead of the highs executable (needs highspy and swiglpk)
+        self.highs_in_process = False
+        # write the MPS file for highs and cplex gzip compressed (flextool.mps.gz)
+        self.compress_mps = False
+        # start each roll from the basis (LP) or solution (MIP) of the previous roll of the same solve
+        self.warm_start = False
+        self.warm_starts = {}
+        # highspy instances kept between the rolls of each complete solve
+        self.highs_models = {}
+        # number of cores given to this run, highs uses them unless the solve has highs_threads. None: all cores of the machine
+        self.threads = None
+        self.highs_scheduler_threads = None
+        # decoded values are kept by alternative, so a cache in value_cache_dir can be shared by several scenarios
+        self.value_cache_dir = value_cache_dir
         print(str(self.root_dir))
         # read the data in
         # open connection to input db
         if scenario_name:
             scen_config = api.filters.scenario_filter.scenario_filter_config(scenario_name)
+        self.entity_index = {}
+        self.parameter_index = defaultdict(lambda: defaultdict(list))
         with (DatabaseMapping(input_db_url) as db):
             if scenario_name:
                 api.filters.scenario_filter.scenario_filter_from_dict(db, scen_config)
             self.check_version(db=db)
+            self.value_cache = self.open_value_cache(db, input_db_url, scenario_name)
+            self.load_parameters(db=db, classes=["model", "solve", "timeline", "timeblockSet", "timeblockSet__timeline"])
             self.timelines = self.params_to_dict(db=db, cl="timeline", par="timestep_duration", mode="defaultdict")
             self.model_solve = self.params_to_dict(db=db, cl="model", par="solves", mode="defaultdict")
             self.solve_modes = self.params_to_dict(db=db, cl="solve", par="solve_mode", mode="dict")
@@ -65,6 +112,7 @@ class FlexToolRunner:
             self.highs_presolve = self.params_to_dict(db=db, cl="solve", par="highs_presolve", mode="dict")
             self.highs_method = self.params_to_dict(db=db, cl="solve", par="highs_method", mode="dict")
             self.highs_parallel = self.params_to_dict(db=db, cl="solve", par="highs_parallel", mode="dict")
+            self.highs_threads = self.params_to_dict(db=db, cl="solve", par="highs_threads", mode="dict")
             self.solve_period_years_represented = self.params_to_dict(db=db, cl="solve", par="years_represented", mode="defaultdict")
             self.solvers = self.params_to_dict(db=db, cl="solve", par="solver", mode="dict")
             self.timeblocks = self.params_to_dict(db=db, cl="timeblockSet", par="block_duration", mode="defaultdict")
@@ -105,20 +153,17 @@ class FlexToolRunner:
         self.create_timeline_from_timestep_duration()
         self.first_of_complete_solve = []
         self.last_of_solve = []
+        self.input_time_branches = None
+        self.solve_data = SolveData()
         #self.write_full_timelines(self.timelines, 'steps.csv')
+        self.record_time("read_database", start)
 
 
     def periods_to_tuples(self, db, cl, par):
-        entities = db.get_entity_items(entity_class_name=cl)
-        params = db.get_parameter_value_items(entity_class_name=cl,
-                                                 parameter_definition_name=par)
         tuple_list = []
-        for entity in entities:
-            params = db.get_parameter_value_items(entity_class_name=cl,
-                                                  entity_name=entity["name"],
-                                                  parameter_definition_name=par)
+        for entity, params in self.indexed_parameters(db, cl, par):
             for param in params:
-                param_value = api.from_database(param["value"], param["type"])
+                param_value = self.value_cache.parsed_value(param)
 
                 for (i, row) in enumerate(param_value.values):
                     if isinstance(param_value.values[i], api.Map):
@@ -145,20 +190,14 @@ class FlexToolRunner:
 
 
     def get_period_timesets(self, db):
-        entities = db.get_entity_items(entity_class_name="solve")
-        params = db.get_parameter_value_items(entity_class_name="solve",
-                                                 parameter_definition_name="period_timeblockSet")
         timeblocks_used_by_solves = defaultdict(list)
 
         solves_in_model = [item for sublist in
                            list(self.model_solve.values()) + list(self.contains_solves.values()) for item in sublist]
-        for entity in entities:
+        for entity, params in self.indexed_parameters(db, "solve", "period_timeblockSet"):
             if entity["name"] in solves_in_model:
-                params = db.get_parameter_value_items(entity_class_name="solve",
-                                                      entity_name=entity["name"],
-                                                      parameter_definition_name="period_timeblockSet")
                 for param in params:
-                    param_value = api.from_database(param["value"], param["type"])
+                    param_value = self.value_cache.parsed_value(param)
                     for (i, row) in enumerate(param_value.indexes):
                         if isinstance(param_value.values[i], api.Map):
                             new_name = param["entity_name"] + "_" + param_value.indexes[i]
@@ -195,6 +234,7 @@ class FlexToolRunner:
                 self.highs_presolve,
                 self.highs_method,
                 self.highs_parallel,
+                self.highs_threads,
                 self.solve_period_years_represented,
                 self.solvers,
                 self.solver_precommand,
@@ -222,6 +262,7 @@ class FlexToolRunner:
 
 
     def create_timeline_from_timestep_duration(self):
+        self.indexed_timelines = {name: Timeline(steps) for name, steps in self.timelines.items()}
         for timeblockSet_name, timeblockSet in list(self.timeblocks.items()):
             if timeblockSet_name in self.new_step_durations.keys():
                 step_duration= float(self.new_step_durations[timeblockSet_name])
@@ -232,7 +273,7 @@ class FlexToolRunner:
                 new_timeblocks = []
                 for timeblock in timeblockSet:
                     first_step = timeblock[0]
-                    first_index = [step[0] for step in old_steps].index(timeblock[0])
+                    first_index = self.indexed_timelines[timeline_name].index[timeblock[0]]
                     step_counter = 0 #float(old_steps[first_index][1])
                     last_index = first_index + int(float(timeblock[1]))
                     added_steps = 0
@@ -251,6 +292,7 @@ class FlexToolRunner:
                 self.timeblocks[timeblockSet_name] = new_timeblocks 
                 new_timeline_name = timeline_name+ "_"+ timeblockSet_name 
                 self.timelines[new_timeline_name] = new_steps
+                self.indexed_timelines[new_timeline_name] = Timeline(new_steps)
                 self.timeblocks__timeline[timeblockSet_name] = [new_timeline_name]
                 self.original_timeline[new_timeline_name] = timeline_name
 
@@ -275,85 +317,38 @@ class FlexToolRunner:
         for period_timeblock in self.timeblocks_used_by_solves[solve]:
             if period_timeblock[1] in self.new_step_durations.keys():
                 create = True
-        if not create:    
+        if not create:
             for timeseries in timeseries_map.keys():
-                shutil.copy('input/'+timeseries,'solve_data/'+timeseries)
+                link_file('input/' + timeseries, 'solve_data/' + timeseries)
+            return
+        timelines=[]
+        for period, timeblockSet in self.timeblocks_used_by_solves[solve]:
+            timeline = self.timeblocks__timeline[timeblockSet][0]
+            if timeline not in timelines:
+                if len(timelines) != 0:
+                    self.logger.error("Error: More than one timeline in the solve or the same timeline with different step durations in different timeblockSets")
+                    sys.exit(-1)
+                timelines.append(timeline)
+        timeline = timelines[0]
+        #the aggregated timeseries are kept in the cache folder by the input data and the new timesteps
+        #and reused by the solves (and runs) with the same timeline
+        input_hash = hashlib.sha256()
+        for filename in list(timeseries_map.keys()) + ['p_node.csv']:
+            with open('input/' + filename, 'rb') as blk:
+                input_hash.update(filename.encode())
+                input_hash.update(blk.read())
+        input_key = input_hash.hexdigest()[:16]
+        timeline_key = hashlib.sha256(repr((timeline, self.timelines[timeline],
+                                            self.timelines[self.original_timeline.get(timeline, timeline)])).encode()).hexdigest()[:16]
+        cache_dir = os.path.join("cache", "timeseries_" + input_key + "_" + timeline_key)
+        if os.path.isdir(cache_dir):
+            self.logger.info("Using the aggregated timeseries of " + timeline + " from the cache")
         else:
-            timelines=[]
-            for period, timeblockSet in self.timeblocks_used_by_solves[solve]:
-                timeline = self.timeblocks__timeline[timeblockSet][0]
-                if timeline not in timelines:
-                    if len(timelines) != 0:
-                        self.logger.error("Error: More than one timeline in the solve or the same timeline with different step durations in different timeblockSets")
-                        sys.exit(-1)
-                    timelines.append(timeline)
-            for timeseries in timeseries_map.keys():
-                with open('input/'+ timeseries,'r') as blk:
-                    filereader = csv.reader(blk, delimiter=',')
-                    with open('solve_data/'+timeseries,'w', newline='') as solve_file:
-                        filewriter = csv.writer(solve_file,delimiter=',')
-                        headers = next(filereader)
-                        filewriter.writerow(headers)
-                        #assumes that the data is in the format:
-                        #[group1, group2, ... group_last, time, numeric_value]
-                        #ie. the numeric data is the last column and the timestep is the one before it.
-                        #and that there are no rows from other groups between the rows of one group 
-                        time_index = headers.index('time')
-                        while True:
-                            try:
-                                datain = next(filereader)
-                                timeline_step_duration = None
-                                for timeline in timelines:
-                                    new_timeline = self.timelines[timeline]
-                                    for timeline_row in new_timeline:
-                                        if timeline_row[0] == datain[time_index]:
-                                            timeline_step_duration = int(float(timeline_row[1]))
-                                            break
-                                if timeline_step_duration != None:
-                                    values = []
-                                    params = datain[0:time_index]
-                                    row = datain[0:time_index + 1]
-                                    values.append(float(datain[time_index + 1])),
-                                    if datain[1] != 'storage_state_reference_value':
-                                        for i in range(timeline_step_duration - 1):
-                                            datain = next(filereader)
-                                            if datain[0:time_index] != params:
-                                                self.logger.error("Cannot find the same timesteps in input data as in timeline for file  " + timeseries + " after " + row[-1])
-                                                sys.exit(-1)
-                                            values.append(float(datain[time_index + 1]))
-
-                                    if timeseries_map[timeseries] == "average":
-                                        out_value = round(sum(values) / len(values), 6)
-                                    else:
-                                        out_value = sum(values)
-                                    row.append(out_value)
-                                    filewriter.writerow(row)
-                                else:
-                                    #find previous timestep that is included and add this to the list
-                                    #this is for the parameters that do not have a value for each timestep
-                                    if datain[1] == 'storage_state_reference_value':
-                                        #get current index:
-                                        counter = 0
-                                        for timestep in self.timelines[self.original_timeline[timeline]]:
-                                            if datain[2] == timestep[0]:
-                                                current_index = counter 
-                                            counter +=1
-                                        found = False
-                                        for timestep in reversed(self.timelines[self.original_timeline[timeline]][0:current_index+1]):
-                                            for timeline_row in new_timeline:
-                                                if timeline_row[0] == timestep[0]:
-                                                    new_index = timeline_row[0]
-                                                    found = True
-                                                    break
-                                            if found:
-                                                break
-                                        if found:
-                                            row = datain[0:time_index]
-                                            row.append(new_index)
-                                            row.append(datain[time_index + 1])
-                                            filewriter.writerow(row)
-                            except Exception:
-                                break
+            build_dir = cache_dir + "_build"
+            shutil.rmtree(build_dir, ignore_errors=True)
+            os.makedirs(build_dir)
+            for timeseries, method in timeseries_map.items():
+                self.aggregate_timeseries(timeseries, method, timeline, build_dir)
             #constaint inflow to a longer step size
             node__inflow = []
             with open('input/'+ 'p_node.csv','r') as blk:
@@ -366,17 +361,101 @@ class FlexToolRunner:
                             node__inflow.append([datain[0],datain[2]])
                     except Exception:
                         break
-            with open('solve_data/'+ 'pt_node_inflow.csv','a', newline='') as blk:
+            with open(os.path.join(build_dir, 'pt_node_inflow.csv'),'a', newline='') as blk:
                 filewriter = csv.writer(blk, delimiter=',')
-                for timeline in timelines:
-                    new_timeline = self.timelines[timeline]
-                    for node__value in node__inflow:
-                        for timeline_row in new_timeline:
-                            timeline_step_duration = int(float(timeline_row[1]))
-                            value = float(node__value[1])*timeline_step_duration
-                            row = [node__value[0],timeline_row[0],value]
-                            filewriter.writerow(row)
+                new_timeline = self.timelines[timeline]
+                for node__value in node__inflow:
+                    for timeline_row in new_timeline:
+                        timeline_step_duration = int(float(timeline_row[1]))
+                        value = float(node__value[1])*timeline_step_duration
+                        row = [node__value[0],timeline_row[0],value]
+                        filewriter.writerow(row)
+            #timeseries aggregated from older input data are not needed anymore
+            for old_dir in Path("cache").glob("timeseries_*"):
+                if not old_dir.name.startswith("timeseries_" + input_key):
+                    shutil.rmtree(old_dir, ignore_errors=True)
+            os.replace(build_dir, cache_dir)
+        for timeseries in timeseries_map.keys():
+            link_file(os.path.join(cache_dir, timeseries), 'solve_data/' + timeseries)
+
+
+    def aggregate_timeseries(self, timeseries, method, timeline, out_dir='solve_data'):
+        """
+        aggregate a timeseries file from input/ to the timesteps of a timeline with new step durations
+        :param timeseries: name of the timeseries file
+        :param method: "sum" or "average" of the original timesteps covered by a new timestep
+        :param timeline: name of the timeline with the new step durations
+        :param out_dir: folder to write the aggregated file to
+        """
+        old_steps = self.indexed_timelines[self.original_timeline.get(timeline, timeline)]
+        new_steps = self.indexed_timelines[timeline]
+        starts = np.array([old_steps.index[name] for name in new_steps.names], dtype=int)
+        #number of original timesteps covered by each new timestep
+        ends = np.searchsorted(old_steps.hours_from_start + old_steps.durations,
+                               old_steps.hours_from_start[starts] + new_steps.durations - 1e-6)
+        sizes = np.minimum(ends, len(old_steps) - 1) - starts + 1
+        #new timestep of each original timestep (-1 if not covered) and the start of the latest new timestep at or before it
+        step_of_old = np.full(len(old_steps), -1)
+        offsets = np.repeat(np.cumsum(sizes) - sizes, sizes)
+        step_of_old[np.repeat(starts, sizes) + np.arange(sizes.sum()) - offsets] = np.repeat(np.arange(len(new_steps)), sizes)
+        previous_start = np.full(len(old_steps), -1)
+        previous_start[starts] = starts
+        previous_start = np.maximum.accumulate(previous_start)
+
+        data = pd.read_csv('input/' + timeseries, dtype=str, keep_default_na=False)
+        #assumes that the data is in the format:
+        #[group1, group2, ... group_last, time, numeric_value]
+        #ie. the numeric data is the last column and the timestep is the one before it.
+        time_index = data.columns.get_loc('time')
+        if data.empty:
+            data.to_csv(os.path.join(out_dir, timeseries), index=False, lineterminator='\r\n')
+            return
+        group_of_row = data.groupby(list(data.columns[:time_index]), sort=False).ngroup().to_numpy()
+        time_of_row = pd.Index(old_steps.names).get_indexer(data['time'])
+        values = data.iloc[:, time_index + 1].to_numpy(dtype=float)
+        step_of_row = np.where(time_of_row >= 0, step_of_old[time_of_row], -1)
+        at_start = (step_of_row >= 0) & (starts[step_of_row] == time_of_row)
+        #storage_state_reference_value does not need a value for each timestep,
+        #values between the new timesteps are moved to the previous new timestep as such
+        storage = (data.iloc[:, 1] == 'storage_state_reference_value').to_numpy()
+        moved = np.flatnonzero(storage & ~at_start & (time_of_row >= 0))
+        moved = moved[previous_start[time_of_row[moved]] >= 0]
+
+        #each group of rows covering one new timestep is reduced in bulk, the storage values at the new timesteps form their own groups
+        aggregated = np.flatnonzero((step_of_row >= 0) & (~storage | at_start))
+        keys = np.where(storage[aggregated], (group_of_row.max() + 1) * len(new_steps) + aggregated,
+                        group_of_row[aggregated] * len(new_steps) + step_of_row[aggregated])
+        _, first, inverse, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+        first = aggregated[first]
+        expected = np.where(storage[first], 1, sizes[step_of_row[first]])
+        if np.any(counts != expected):
+            after = data['time'].iloc[first[np.flatnonzero(counts != expected)[0]]]
+            self.logger.error("Cannot find the same timesteps in input data as in timeline for file  " + timeseries + " after " + after)
+            sys.exit(-1)
+        #sum the values of each group in the order of the rows, a column at a time, for the same result as sum()
+        ordered = values[aggregated[np.argsort(inverse, kind='stable')]]
+        group_offsets = np.cumsum(counts) - counts
+        totals = np.zeros(len(counts))
+        for size in np.unique(counts):
+            size_groups = np.flatnonzero(counts == size)
+            block = ordered[group_offsets[size_groups, None] + np.arange(size)]
+            total = 0.0 + block[:, 0]
+            for column in range(1, size):
+                total += block[:, column]
+            totals[size_groups] = total
+        if method == "average":
+            out_values = [round(value, 6) for value in (totals / counts).tolist()]
+        else:
+            out_values = totals.tolist()
 
+        new_names = np.array(new_steps.names, dtype=object)
+        old_names = np.array(old_steps.names, dtype=object)
+        rows = np.concatenate([first, moved])
+        out = data.iloc[rows, :time_index].reset_index(drop=True)
+        out['time'] = np.concatenate([new_names[step_of_row[first]], old_names[previous_start[time_of_row[moved]]]])
+        out[data.columns[time_index + 1]] = pd.Series(out_values + data.iloc[moved, time_index + 1].tolist(), dtype=object)
+        out = out.iloc[np.argsort(rows, kind='stable')]
+        out.to_csv(os.path.join(out_dir, timeseries), index=False, lineterminator='\r\n')
 
     def make_steps(self, start, stop):
         """
@@ -394,23 +473,32 @@ class FlexToolRunner:
             active_step += 1
         return steps
 
-    def write_full_timelines(self, stochastic_timesteps, period__timeblocks_in_this_solve, timeblocks__timeline, timelines, filename):
+    def full_timeline_steps(self, period__timeblocks_in_this_solve, timeblocks__timeline, timelines):
+        """
+        period,step lines of the timelines used by the timeblocks of a solve, as written to steps_in_timeline.csv
+        :return: string of the lines
+        """
+        lines = []
+        for period__timeblock in period__timeblocks_in_this_solve:
+            timeline = timeblocks__timeline.get(period__timeblock[1], [None])[0]
+            for item in timelines.get(timeline, []):
+                lines.append(period__timeblock[0] + ',' + item[0] + '\n')
+        return "".join(lines)
+
+    def write_full_timelines(self, stochastic_timesteps, period__timeblocks_in_this_solve, timeblocks__timeline, timelines, filename, full_timeline_steps = None):
         """
         write to file a list of timestep as defined in timelines.
         :param filename: filename to write to
         :param steplist: list of timestep indexes
+        :param full_timeline_steps: lines from full_timeline_steps, if already made for the solve
         :return:
         """
-        with open(filename, 'w') as outfile:
+        if full_timeline_steps is None:
+            full_timeline_steps = self.full_timeline_steps(period__timeblocks_in_this_solve, timeblocks__timeline, timelines)
+        with self.solve_data.open(filename) as outfile:
             # prepend with a header
             outfile.write('period,step\n')
-            for period__timeblock in period__timeblocks_in_this_solve:
-                for timeline in timelines:
-                    for timeblock_in_timeline, tt in timeblocks__timeline.items():
-                        if period__timeblock[1] == timeblock_in_timeline:
-                            if timeline == tt[0]:
-                                for item in timelines[timeline]:
-                                    outfile.write(period__timeblock[0] + ',' + item[0] + '\n')
+            outfile.write(full_timeline_steps)
             for step in stochastic_timesteps:
                 outfile.write(step[0] + ',' + step[1] + '\n')
 
@@ -422,14 +510,14 @@ class FlexToolRunner:
         :return: nothing
         """
         if not complete:
-            with open(filename, 'w') as outfile:
+            with self.solve_data.open(filename) as outfile:
                 # prepend with a header
                 outfile.write('period,step,step_duration\n')
                 for period_name, period in timeline.items():
                     for item in period:
                         outfile.write(period_name + ',' + item[0] + ',' + str(item[2]) + '\n')
         else: 
-            with open(filename, 'w') as outfile:
+            with self.solve_data.open(filename) as outfile:
                 # prepend with a header
                 outfile.write('period,step,complete_step_duration\n')
                 for period_name, period in timeline.items():
@@ -443,7 +531,7 @@ class FlexToolRunner:
         :param years_represented: dict of periods with the number of years represented
         :return: nothing
         """
-        with open(filename, 'w') as outfile:
+        with self.solve_data.open(filename) as outfile:
             # prepend with a header
             outfile.write('period,years_from_solve,p_years_from_solve,p_years_represented\n')
             year_count = 0
@@ -459,7 +547,7 @@ class FlexToolRunner:
                     year_count = year_count + years_to_cover_within_year
 
     def write_hole_multiplier(self, solve, filename):
-        with open(filename, 'w') as holefile:
+        with self.solve_data.open(filename) as holefile:
             holefile.write("solve,p_hole_multiplier\n")
             if self.hole_multipliers[solve]:
                 holefile.write(solve + "," + self.hole_multipliers[solve] + "\n")
@@ -472,7 +560,7 @@ class FlexToolRunner:
         :param timeline: list of tuples containing the period and the timestep
         :return: nothing
         """
-        with open(filename, 'w') as outfile:
+        with self.solve_data.open(filename) as outfile:
             # prepend with a header
             outfile.write('period,param\n')
             year_count = 0
@@ -497,11 +585,14 @@ class FlexToolRunner:
             steplist.append(self.steplist[i])
         return steplist
 
-    def model_run(self, current_solve):
+    def model_run(self, current_solve, current_roll=None):
         """
         run the model executable once
+        :param current_solve: the complete solve, used for the solver settings
+        :param current_roll: the roll of the complete solve that is run, current_solve if not given
         :return the output of glpsol:
         """
+        current_roll = current_roll or current_solve
         try:
             solver = self.solvers[current_solve]
         except KeyError:
@@ -524,101 +615,134 @@ class FlexToolRunner:
         flextool_model_file = str(self.flextool_dir / "flextool.mod")
         flextool_base_data_file = str(self.flextool_dir / "flextool_base.dat")
         glp_solution_file = str(self.root_dir / "glpsol_solution.txt")
-        mps_file = str(self.root_dir / "flextool.mps")
+        mps_file = str(self.root_dir / ("flextool.mps.gz" if self.compress_mps else "flextool.mps"))
         highs_option_file = str(self.bin_dir / "highs.opt")
         cplex_sol_file = str(self.root_dir / "cplex.sol")
         flextool_sol_file = str(self.root_dir / "flextool.sol")
+        result = {"solve": current_roll, "solver": solver, "status": None, "objective": None, "mip_gap": None,
+                  "iterations": None, "nodes": None, "solve_seconds": None}
+        self.solve_results.append(result)
         if solver == "glpsol":
-            only_glpsol = [glpsol_file, '--model', flextool_model_file, '-d', flextool_base_data_file, '--cbg','-w', glp_solution_file] + sys.argv[3:]
+            only_glpsol = [glpsol_file, '--model', flextool_model_file, '-d', flextool_base_data_file, '--cbg','-w', glp_solution_file] + self.solver_args
             try:
-                completed = subprocess.run(only_glpsol)
+                start = time.perf_counter()
+                completed = self.run_process(only_glpsol, "glpsol", partial(parse_glpsol_output, result=result))
+                result["solve_seconds"] = round(time.perf_counter() - start, 3)
             except Exception as e:
                 self.logger.exception(f"Error occurred: {e}")
                 sys.exit(1)
-            if completed.returncoode != 0:
+            if completed.returncode != 0:
                 self.logger.error(f'glpsol failed: {completed.returncode}')
                 sys.exit(completed.returncode)
             
-            #checking if solution is infeasible. This is quite clumsy way of doing this, but the solvers do not give infeasible exitstatus
-            with open('glpsol_solution.txt','r') as inf_file:
-                inf_content = inf_file.read() 
-                if 'INFEASIBLE' in inf_content:
-                    self.logger.error(f"The model is infeasible. Check the constraints.")
-                    sys.exit(1)
+            #the solvers do not give an infeasible exit status, the status is in the header of the solution file
+            result.update(read_solution_header(glp_solution_file))
+            if "INFEASIBLE" in (result["status"] or "") or result["status"] == "INTEGER EMPTY":
+                self.logger.error(f"The model is infeasible. Check the constraints.")
+                sys.exit(1)
+
+        elif solver == "highs" and self.highs_in_process and highspy is not None:
+            return self.model_run_highspy(current_solve, current_roll, flextool_model_file, flextool_base_data_file, highs_option_file, flextool_sol_file, result)
 
         elif solver == "highs" or solver == "cplex":
+            if solver == "highs" and self.highs_in_process:
+                self.logger.warning("highspy or swiglpk is not installed, using the highs executable")
             highs_step1 = [glpsol_file, '--check', '--model', flextool_model_file, '-d', flextool_base_data_file,
-                           '--wfreemps', mps_file] + sys.argv[3:]
-            completed = subprocess.run(highs_step1)
+                           '--wfreemps', mps_file] + self.solver_args
+            completed = self.run_process(highs_step1, "write_mps")
             if completed.returncode != 0:
                 self.logger.error(f'glpsol mps writing failed: {completed.returncode}')
                 sys.exit(completed.returncode)
             print("GLPSOL wrote the problem as MPS file\n")
 
             #check if the problem has columns(nodes)
-            with open(mps_file, 'r') as mps_file_handle:
-                mps_content = mps_file_handle.read() 
-                if 'Columns:    0' in mps_content:
-                    self.logger.error(f"The problem has no columns. Check that the model has nodes.")
-                    sys.exit(-1)
+            mps_info = mps_header(mps_file)
+            if mps_info.get("Columns") == "0":
+                self.logger.error(f"The problem has no columns. Check that the model has nodes.")
+                sys.exit(-1)
 
             if solver == "highs":
-                highs_step2 = [highs_file, mps_file, f"--options_file={highs_option_file}"] + \
+                #the highs executable has no command line option for the threads, they are given in a copy of the options file
+                highs_solve_option_file = self.write_highs_options(highs_option_file, self.solve_threads(current_solve))
+                highs_step2 = [highs_file, mps_file, f"--options_file={highs_solve_option_file}"] + \
                               [''.join(['--presolve='] + [self.highs_presolve.get(current_solve, "on")])] + \
                               [''.join(['--solver='] + [self.highs_method.get(current_solve, "choose")])] + \
                               [''.join(['--parallel='] + [self.highs_parallel.get(current_solve, "off")])]
-                completed = subprocess.run(highs_step2)
+                start = time.perf_counter()
+                completed = self.run_process(highs_step2, "solver", partial(parse_highs_output, result=result))
+                result["solve_seconds"] = round(time.perf_counter() - start, 3)
                 if completed.returncode != 0:
                     self.logger.error(f'Highs solver failed: {completed.returncode}')
                     sys.exit(completed.returncode)
                 print("HiGHS solved the problem\n")
                 
-                #checking if solution is infeasible. This is quite clumsy way of doing this, but the solvers do not give infeasible exitstatus
-                with open('HiGHS.log','r') as inf_file:
-                    inf_content = inf_file.read() 
-                    if 'Model   status      : Infeasible' in inf_content:
-                        self.logger.error(f"The model is infeasible. Check the constraints.")
-                        sys.exit(1)
+                #the solvers do not give an infeasible exit status, highs reports the model status at the end of its output
+                if result["status"] == "Infeasible":
+                    self.logger.error(f"The model is infeasible. Check the constraints.")
+                    sys.exit(1)
             
             elif solver == "cplex": #or gurobi
+                #warm start from the basis (LP) or MIP start of the previous roll, CPLEX matches them by the names in the files
+                warm_start_read = []
+                warm_start_write = []
+                if self.warm_start:
+                    extension = ".mst" if mps_info.get("Class") == "MIP" else ".bas"
+                    warm_start_file = str(self.root_dir / ("warm_start_" + current_solve + extension))
+                    if current_solve in self.warm_starts and self.warm_starts[current_solve][0] == warm_start_file and os.path.exists(warm_start_file):
+                        #the names of some constraints include the roll
+                        rename_roll(warm_start_file, self.warm_starts[current_solve][1], current_roll, str(self.root_dir / ("warm_start" + extension)))
+                        warm_start_read = ['read', str(self.root_dir / ("warm_start" + extension))]
+                    warm_start_write = ['write', warm_start_file]
                 if current_solve not in self.solver_precommand.keys():
                     if solver == "cplex":
                         if current_solve not in self.solver_arguments.keys():
-                            cplex_step = ['cplex', '-c', 'read', mps_file, 'opt', 'write', cplex_sol_file, 'quit']  + sys.argv[3:]
+                            cplex_step = ['cplex', '-c', 'read', mps_file] + warm_start_read + ['opt', 'write', cplex_sol_file] + warm_start_write + ['quit'] + self.solver_args
                         else:
                             cplex_step = ['cplex', '-c', 'read', mps_file]
                             cplex_step += self.solver_arguments[current_solve]
-                            cplex_step += ['opt', 'write', cplex_sol_file, 'quit']
-                            cplex_step += sys.argv[3:]
+                            cplex_step += warm_start_read + ['opt', 'write', cplex_sol_file] + warm_start_write + ['quit']
+                            cplex_step += self.solver_args
 
-                        completed = subprocess.run(cplex_step)
+                        start = time.perf_counter()
+                        completed = self.run_process(cplex_step, "solver")
+                        result["solve_seconds"] = round(time.perf_counter() - start, 3)
                         if completed.returncode != 0:
                             self.logger.error(f'Cplex solver failed: {completed.returncode}')
                             sys.exit(completed.returncode) 
                         
-                        completed = self.cplex_to_glpsol(cplex_sol_file, flextool_sol_file)
+                        start = time.perf_counter()
+                        completed = self.cplex_to_glpsol(cplex_sol_file, flextool_sol_file, result)
+                        self.record_time("convert_solution", start)
+                        if warm_start_write:
+                            self.warm_starts[current_solve] = (warm_start_file, current_roll)
                 else:
                     s_wrapper = self.solver_precommand[current_solve]
                     if solver == "cplex":
                         if current_solve not in self.solver_arguments.keys():
-                            cplex_step = [s_wrapper, 'cplex', '-c', 'read', mps_file,'opt', 'write', cplex_sol_file, 'quit']  + sys.argv[3:]
+                            cplex_step = [s_wrapper, 'cplex', '-c', 'read', mps_file] + warm_start_read + ['opt', 'write', cplex_sol_file] + warm_start_write + ['quit'] + self.solver_args
                         else:
                             cplex_step = [s_wrapper, 'cplex', '-c', 'read', mps_file]
                             cplex_step += self.solver_arguments[current_solve]
-                            cplex_step += ['opt', 'write', cplex_sol_file, 'quit']
-                            cplex_step += sys.argv[3:]
+                            cplex_step += warm_start_read + ['opt', 'write', cplex_sol_file] + warm_start_write + ['quit']
+                            cplex_step += self.solver_args
 
-                        completed = subprocess.run(cplex_step)
+                        start = time.perf_counter()
+                        completed = self.run_process(cplex_step, "solver")
+                        result["solve_seconds"] = round(time.perf_counter() - start, 3)
                         if completed.returncode != 0:
                             self.logger.error(f'Cplex solver failed: {completed.returncode}')
                             sys.exit(completed.returncode) 
                         
-                        completed = self.cplex_to_glpsol(cplex_sol_file, flextool_sol_file)
+                        start = time.perf_counter()
+                        completed = self.cplex_to_glpsol(cplex_sol_file, flextool_sol_file, result)
+                        self.record_time("convert_solution", start)
+                        if warm_start_write:
+                            self.warm_starts[current_solve] = (warm_start_file, current_roll)
 
 
             highs_step3 = [glpsol_file, '--model', flextool_model_file, '-d', flextool_base_data_file, '-r',
-                        flextool_sol_file] + sys.argv[3:]
-            completed = subprocess.run(highs_step3)
+                        flextool_sol_file] + self.solver_args
+            completed = self.run_process(highs_step3, "read_results")
             if completed.returncode == 0:
                 print("GLPSOL wrote the results into csv files\n")
         else:
@@ -626,100 +750,374 @@ class FlexToolRunner:
             sys.exit(-1)
         return completed.returncode
 
-    def cplex_to_glpsol(self,cplexfile,solutionfile): 
-        
+    def model_run_highspy(self, current_solve, current_roll, model_file, data_file, highs_option_file, solution_file, result):
+        """
+        generate the model with the GLPK library, solve it with highspy and write the results from the same model instance,
+        instead of writing an MPS file for the highs executable and generating the model again to read the solution
+        :param result: solve result record, filled from the highs model status and info
+        :return: 0 on success
+        """
+        output_file = str(self.root_dir / "glpsol_output.txt")
+        start = time.perf_counter()
+        tran = glpk.glp_mpl_alloc_wksp()
+        prob = glpk.glp_create_prob()
         try:
-            tree = ET.parse(cplexfile)
-        except (OSError):
-            self.logger.error('The CPLEX solver does not produce a solution file if the problem is infeasible. Check the constraints, more info at cplex.log')
-            sys.exit(-1)
-        root = tree.getroot()
-
-        if root.find('header').get('solutionStatusString') == "optimal":
-            with open(solutionfile,'w') as glpsol_file:
-                
-                obj = root.find('header').get('objectiveValue')
-
-                for constraint in root.iter('constraint'):
-                    rows = constraint.get('index')
-                rows = int(rows) + 2
+            if (glpk.glp_mpl_read_model(tran, model_file, 1) != 0 or glpk.glp_mpl_read_data(tran, data_file) != 0
+                    or glpk.glp_mpl_generate(tran, output_file) != 0):
+                self.logger.error("GLPK model generation failed")
+                return 1
+            glpk.glp_mpl_build_prob(tran, prob)
+            self.record_time("generate_model", start)
+            if glpk.glp_get_num_cols(prob) == 0:
+                self.logger.error(f"The problem has no columns. Check that the model has nodes.")
+                sys.exit(-1)
 
-                for variable in root.iter('variable'):
-                    col = variable.get('index')
-                col = int(col) + 1
-                
-                glpsol_file.write("s bas "+str(rows)+" "+str(col)+" f f "+obj+"\n")
-                
-                #For some reason the glpsol constraint the first variable row to be the objective function value.
-                #This is not stated anywhere in the glpk documentation
-                glpsol_file.write("i 1 b "+obj+" 0\n")
-            
-                for constraint in root.iter("constraint"):
-                    slack = constraint.get('slack')
-                    index = int(constraint.get('index')) + 2
-                    status = constraint.get('status')
-                    dual = constraint.get('dual')
-                    
-                    if status == "BS":
-                        status = 'b'
-                    elif status == "LL":
-                        status = 'l'
-                    elif status == "UL":
-                        status = 'u'
-                    
-                    glpsol_file.write("i"+" "+str(index)+" "+status+" "+slack+" "+dual+"\n")
-
-                for variable in root.iter('variable'):
-                    val = variable.get('value')
-                    index = int(variable.get('index')) +1
-                    status = variable.get('status')
-                    reduced = variable.get('reducedCost')
-                    
-                    if status == "BS":
-                        status = 'b'
-                    elif status == "LL":
-                        status = 'l'
-                    elif status == "UL":
-                        status = 'u'
-
-                    glpsol_file.write("j"+" "+str(index)+" "+status+" "+val+" "+reduced+"\n")
-                
-                glpsol_file.write("e o f")
-        elif root.find('header').get('solutionStatusString') == "integer optimal solution":
-            with open(solutionfile,'w') as glpsol_file:
-                
-                obj = root.find('header').get('objectiveValue')
+            start = time.perf_counter()
+            lp, cost_row = glpk_to_highs_lp(prob)
+            mip = glpk.glp_get_num_int(prob) > 0
+            highs, reused = self.highs_instance(current_solve, lp)
+            highs.readOptions(highs_option_file)
+            threads = self.solve_threads(current_solve)
+            highs.setOptionValue("threads", threads)
+            if self.highs_scheduler_threads not in (None, threads):
+                # the thread pool of highs is shared by the whole process and created with the threads of the first run
+                highspy.Highs.resetGlobalScheduler(True)
+            self.highs_scheduler_threads = threads
+            highs.setOptionValue("presolve", self.highs_presolve.get(current_solve, "on"))
+            highs.setOptionValue("solver", self.highs_method.get(current_solve, "choose"))
+            highs.setOptionValue("parallel", self.highs_parallel.get(current_solve, "off"))
+            highs.setOptionValue("glpsol_cost_row_location", cost_row if cost_row else -1)
+            if self.warm_start:
+                col_names = [roll_independent_name(glpk.glp_get_col_name(prob, j), current_roll) for j in range(1, lp.num_col_ + 1)]
+                row_names = [roll_independent_name(glpk.glp_get_row_name(prob, i), current_roll)
+                             for i in range(1, glpk.glp_get_num_rows(prob) + 1) if i != cost_row]
+                # a reused LP keeps the basis of the previous roll, which is a better start than the one matched by names
+                if current_solve in self.warm_starts and (mip or not reused):
+                    self.set_highs_warm_start(highs, lp, self.warm_starts[current_solve], col_names, row_names)
+            elif reused:
+                highs.clearSolver()
+            self.record_time("load_model", start)
+
+            start = time.perf_counter()
+            highs.run()
+            self.record_time("solver", start)
+            result["solve_seconds"] = round(time.perf_counter() - start, 3)
+            info = highs.getInfo()
+            self.add_profile_value("solver", "simplex_iterations", info.simplex_iteration_count)
+            if mip:
+                self.add_profile_value("solver", "mip_nodes", info.mip_node_count)
+            model_status = highs.getModelStatus()
+            result["status"] = highs.modelStatusToString(model_status)
+            result["objective"] = info.objective_function_value
+            result["iterations"] = info.simplex_iteration_count + info.ipm_iteration_count + info.crossover_iteration_count
+            if mip:
+                result["mip_gap"] = info.mip_gap
+                result["nodes"] = info.mip_node_count
+            if model_status == highspy.HighsModelStatus.kInfeasible:
+                self.logger.error(f"The model is infeasible. Check the constraints.")
+                sys.exit(1)
+            #like with the highs executable, the solution is used also when highs stops early (e.g. at a time limit) with a feasible solution
+            if model_status in (highspy.HighsModelStatus.kUnbounded, highspy.HighsModelStatus.kUnboundedOrInfeasible) \
+                    or info.primal_solution_status != highspy.SolutionStatus.kSolutionStatusFeasible:
+                self.logger.error(f"Highs solver failed: {highs.modelStatusToString(model_status)}")
+                return 1
+            if model_status != highspy.HighsModelStatus.kOptimal:
+                self.logger.warning(f"Highs stopped before optimality: {highs.modelStatusToString(model_status)}, using the best solution found")
+            print("HiGHS solved the problem\n")
+            if self.warm_start:
+                self.warm_starts[current_solve] = self.get_highs_warm_start(highs, mip, col_names, row_names)
+
+            # the solution is passed to GLPK in the glpsol raw format, the same one the highs executable writes
+            start = time.perf_counter()
+            highs.writeSolution(solution_file, 2)
+            if mip:
+                read_status = glpk.glp_read_mip(prob, solution_file)
+                solution_type = glpk.GLP_MIP
+            else:
+                read_status = glpk.glp_read_sol(prob, solution_file)
+                solution_type = glpk.GLP_SOL
+            if read_status != 0:
+                self.logger.error("GLPK could not read the solution written by highspy")
+                return 1
+            return_code = glpk.glp_mpl_postsolve(tran, prob, solution_type)
+        finally:
+            glpk.glp_mpl_free_wksp(tran)
+            glpk.glp_delete_prob(prob)
+            # GLPK keeps the display output file open until the workspace is freed,
+            # it has the output of both the model generation and the postsolve
+            self.echo_gmpl_output(output_file, "read_results", generate_phase="generate_model")
+        self.record_time("read_results", start)
+        if return_code == 0:
+            print("GLPK wrote the results into csv files\n")
+        return return_code
+
+    def solve_threads(self, current_solve):
+        """
+        threads for highs in the solve: the highs_threads parameter of the solve if given,
+        otherwise the cores given to the run (all cores of the machine, or a share of them when scenarios run in parallel)
+        """
+        threads = self.highs_threads.get(current_solve)
+        if threads is None:
+            threads = self.threads or os.cpu_count() or 1
+        threads = max(1, int(float(threads)))
+        self.add_profile_value("solver", "threads", threads)
+        return threads
+
+    def write_highs_options(self, highs_option_file, threads):
+        """
+        write a copy of the highs options file with the threads of the solve to the work directory
+        :return: path of the copy
+        """
+        solve_option_file = str(self.root_dir / "highs_solve.opt")
+        with open(highs_option_file, 'r') as options, open(solve_option_file, 'w') as solve_options:
+            for line in options:
+                if line.partition("=")[0].strip() != "threads":
+                    solve_options.write(line.rstrip("\n") + "\n")
+            solve_options.write("threads=" + str(threads) + "\n")
+        return solve_option_file
+
+    def highs_instance(self, current_solve, lp):
+        """
+        the highspy instance of a complete solve is kept between its rolls and released after its last roll.
+        If the constraint matrix of the roll is the same as in the previous roll (rolls of equal length),
+        only the costs and bounds that changed are updated in the kept instance, otherwise the model is passed again
+        :return: highspy instance, True if the previous model was updated
+        """
+        previous = self.highs_models.get(current_solve)
+        if previous is not None and same_lp_structure(previous[1], lp):
+            highs = previous[0]
+            update_highs_lp(highs, previous[1], lp)
+            reused = True
+        else:
+            highs = highspy.Highs()
+            highs.passModel(lp)
+            reused = False
+        self.highs_models[current_solve] = (highs, lp)
+        self.add_profile_value("load_model", "model_reused", int(reused))
+        return highs, reused
+
+    def get_highs_warm_start(self, highs, mip, col_names, row_names):
+        """
+        save the solution (MIP) or the basis (LP) of a solved highs model by column and row names,
+        the names of the overlapping time steps are the same in the next roll (see roll_independent_name)
+        """
+        if mip:
+            return {"mip": True, "col_value": dict(zip(col_names, highs.getSolution().col_value))}
+        basis = highs.getBasis()
+        if not basis.valid:
+            return None
+        return {"mip": False, "col_status": dict(zip(col_names, basis.col_status)),
+                "row_status": dict(zip(row_names, basis.row_status))}
+
+    def set_highs_warm_start(self, highs, lp, warm_start, col_names, row_names):
+        """
+        give highs the solution or the basis of the previous roll for the columns and rows with the same name.
+        Columns that were not in the previous roll start nonbasic at a bound and new rows start with a basic slack,
+        highs completes the partial MIP start and repairs the basis if the number of basic variables does not match.
+        Nothing is given if no column matches, a cold start with presolve is faster than an all slack basis
+        """
+        if warm_start is None:
+            return
+        previous = warm_start["col_value"] if warm_start["mip"] else warm_start["col_status"]
+        matched = sum(name in previous for name in col_names)
+        self.add_profile_value("load_model", "warm_start_columns", matched)
+        if matched == 0:
+            return
+        if warm_start["mip"]:
+            index = [j for j, name in enumerate(col_names) if name in previous]
+            highs.setSolution(len(index), np.array(index, dtype=np.int32), np.array([previous[col_names[j]] for j in index]))
+            return
+        inf = highspy.kHighsInf
+        def nonbasic(lower, upper, status):
+            if status == highspy.HighsBasisStatus.kBasic:
+                return status
+            if status == highspy.HighsBasisStatus.kUpper and upper < inf:
+                return status
+            if lower > -inf:
+                return highspy.HighsBasisStatus.kLower
+            return highspy.HighsBasisStatus.kUpper if upper < inf else highspy.HighsBasisStatus.kZero
+
+        basis = highspy.HighsBasis()
+        basis.col_status = [nonbasic(lower, upper, previous.get(name, highspy.HighsBasisStatus.kLower))
+                            for name, lower, upper in zip(col_names, list(lp.col_lower_), list(lp.col_upper_))]
+        previous = warm_start["row_status"]
+        basis.row_status = [nonbasic(lower, upper, previous.get(name, highspy.HighsBasisStatus.kBasic))
+                            for name, lower, upper in zip(row_names, list(lp.row_lower_), list(lp.row_upper_))]
+        basis.valid = True
+        basis.alien = True
+        if highs.setBasis(basis) == highspy.HighsStatus.kError:
+            self.logger.warning("Highs did not accept the basis of the previous roll, solving without warm start")
+
+    def echo_gmpl_output(self, output_file, phase, generate_phase=None):
+        """
+        print the display output of the GMPL model written to output_file and record the phase timings it contains
+        :param generate_phase: phase of the timings before the solve statement of the model, if other than phase
+        """
+        if not os.path.exists(output_file):
+            return
+        with open(output_file, 'r', errors='replace') as output:
+            lines = output.readlines()
+        os.remove(output_file)
+        for line in lines:
+            sys.stdout.write(line)
+            self.record_gmpl_timing(line, phase, generate_phase)
+
+    def record_gmpl_timing(self, line, phase, generate_phase=None):
+        if not hasattr(self, "gmpl_timings"):
+            # the timing parameters of the model are of the form: param setup1 := gmtime() - datetime0 ...
+            # and are mapped to whether they are taken before the solve statement
+            with open(self.flextool_dir / "flextool.mod", 'r') as model_file:
+                model = model_file.read()
+            solve_statement = re.search(r'^solve;', model, re.MULTILINE)
+            self.gmpl_timings = {timing.group(1): solve_statement is None or timing.start() < solve_statement.start()
+                                 for timing in re.finditer(r'^param (\w+) := gmtime\(\) - datetime0', model, re.MULTILINE)}
+        name, separator, value = line.strip().partition(" = ")
+        if separator and name in self.gmpl_timings:
+            if generate_phase and self.gmpl_timings[name]:
+                phase = generate_phase
+            self.add_profile_value(phase, "gmpl_" + name, float(value))
+
+    def run_process(self, command, phase, parse_line=None):
+        """
+        run glpsol or a solver, echo its output and record its wall time, the largest sampled memory use (if psutil is installed)
+        and the phase timings displayed by the GMPL model to the run profile
+        :param command: command line of the process
+        :param phase: name of the phase in the profile
+        :param parse_line: optional function called with each line of the output
+        :return: subprocess.CompletedProcess
+        """
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors='replace')
+        rss_samples = []
+        sampler = None
+        if psutil is not None:
+            sampling_done = threading.Event()
+            sampler = threading.Thread(target=sample_rss, args=(process.pid, rss_samples, sampling_done), daemon=True)
+            sampler.start()
+        with process.stdout:
+            for line in process.stdout:
+                sys.stdout.write(line)
+                self.record_gmpl_timing(line, phase)
+                if parse_line is not None:
+                    parse_line(line)
+        process.wait()
+        if sampler is not None:
+            sampling_done.set()
+            sampler.join()
+            # the memory use between the samples is not seen, so this is not the exact peak of the process
+            if rss_samples:
+                self.add_profile_value(phase, "max_sampled_rss_mb", round(max(rss_samples) / (1024 * 1024), 1))
+        self.record_time(phase, start)
+        return subprocess.CompletedProcess(command, process.returncode)
+
+    def write_solve_results(self):
+        """
+        write the solver status, objective, MIP gap, iterations and solve time of each solve to output/solve_results.csv
+        """
+        os.makedirs("output", exist_ok=True)
+        with open("output/solve_results.csv", 'w', newline='') as results_file:
+            writer = csv.DictWriter(results_file, fieldnames=["solve", "solver", "status", "objective", "mip_gap", "iterations", "nodes", "solve_seconds"],
+                                    lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(self.solve_results)
 
-                for constraint in root.iter('constraint'):
-                    rows = constraint.get('index')
-                rows = int(rows) + 2
+    def add_profile_value(self, phase, metric, value):
+        self.profile.append({"solve": self.profile_solve, "phase": phase, "metric": metric, "value": value})
 
-                for variable in root.iter('variable'):
-                    col = variable.get('index')
-                col = int(col) + 1
-                
-                glpsol_file.write("s mip "+str(rows)+" "+str(col)+" o "+obj+"\n")
-                
-                #For some reason the glpsol requires the first constraint row to be the objective function value.
-                #This is not stated anywhere in the glpk documentation
-                glpsol_file.write("i 1 "+obj+"\n")
-            
-                for constraint in root.iter("constraint"):
-                    slack = constraint.get('slack')
-                    index = int(constraint.get('index')) + 2
-                    
-                    glpsol_file.write("i"+" "+str(index)+" "+slack+"\n")
+    def record_time(self, phase, start):
+        """
+        record the seconds from start (time.perf_counter()) to now for the phase of the current solve
+        """
+        self.add_profile_value(phase, "seconds", round(time.perf_counter() - start, 3))
 
-                for variable in root.iter('variable'):
-                    val = variable.get('value')
-                    index = int(variable.get('index')) +1
+    def write_profile(self):
+        """
+        write the run profile to output/run_profile.csv and output/run_profile.json
+        """
+        os.makedirs("output", exist_ok=True)
+        with open("output/run_profile.csv", 'w', newline='') as profile_file:
+            writer = csv.DictWriter(profile_file, fieldnames=["solve", "phase", "metric", "value"], lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(self.profile)
+        with open("output/run_profile.json", 'w') as profile_file:
+            json.dump(self.profile, profile_file, indent=1)
+
+    def cplex_to_glpsol(self,cplexfile,solutionfile,result=None): 
+        """
+        convert a CPLEX xml solution to a glpsol raw solution file and fill the solve result record from its header.
+        The xml is streamed with iterparse and each constraint and variable is written as soon as it is read,
+        so the memory use does not grow with the size of the problem.
+        The numbers of rows and columns in the first line are known only at the end,
+        so the line is first written padded with spaces and then overwritten in place.
+        """
+        statuses = {"BS": "b", "LL": "l", "UL": "u"}
+        try:
+            events = ET.iterparse(cplexfile, events=("start", "end"))
+            _, root = next(events)
+        except (OSError, ET.ParseError):
+            self.logger.error('The CPLEX solver does not produce a solution file if the problem is infeasible. Check the constraints, more info at cplex.log')
+            sys.exit(-1)
 
-                    glpsol_file.write("j"+" "+str(index)+" "+val+"\n")
-                
-                glpsol_file.write("e o f")
-        else:
-            self.logger.error(f"Optimality could not be reached. Check the flextool.sol file for more")
-            sys.exit(1)
+        glpsol_file = None
+        rows = 1
+        col = 0
+        try:
+            for event, element in events:
+                if event == "start":
+                    if element.tag in ("linearConstraints", "variables"):
+                        container = element
+                    continue
+                if element.tag == "header":
+                    obj = element.get('objectiveValue')
+                    solution_status = element.get('solutionStatusString')
+                    if result is not None:
+                        result["status"] = solution_status
+                        result["objective"] = float(obj) if obj else None
+                        iterations = [int(element.get(name)) for name in ('simplexIterations', 'barrierIterations', 'MIPIterations') if element.get(name)]
+                        result["iterations"] = sum(iterations) if iterations else None
+                        result["nodes"] = int(element.get('MIPNodes')) if element.get('MIPNodes') else None
+                        result["mip_gap"] = float(element.get('MIPRelativeGap')) if element.get('MIPRelativeGap') else None
+                    if solution_status == "optimal":
+                        mip = False
+                    elif solution_status == "integer optimal solution":
+                        mip = True
+                    else:
+                        self.logger.error(f"Optimality could not be reached. Check the flextool.sol file for more")
+                        sys.exit(1)
+                    glpsol_file = open(solutionfile, 'w')
+                    glpsol_file.write(" " * (len(obj) + 60) + "\n")
+                    #For some reason the glpsol requires the first constraint row to be the objective function value.
+                    #This is not stated anywhere in the glpk documentation
+                    glpsol_file.write("i 1 " + obj + "\n" if mip else "i 1 b " + obj + " 0\n")
+                elif element.tag == "constraint":
+                    index = int(element.get('index')) + 2
+                    if mip:
+                        glpsol_file.write("i " + str(index) + " " + element.get('slack') + "\n")
+                    else:
+                        status = element.get('status')
+                        glpsol_file.write("i " + str(index) + " " + statuses.get(status, status) + " "
+                                          + element.get('slack') + " " + element.get('dual') + "\n")
+                    rows = index
+                    container.clear()
+                elif element.tag == "variable":
+                    index = int(element.get('index')) + 1
+                    if mip:
+                        glpsol_file.write("j " + str(index) + " " + element.get('value') + "\n")
+                    else:
+                        status = element.get('status')
+                        glpsol_file.write("j " + str(index) + " " + statuses.get(status, status) + " "
+                                          + element.get('value') + " " + element.get('reducedCost') + "\n")
+                    col = index
+                    container.clear()
+            glpsol_file.write("e o f")
+            glpsol_file.seek(0)
+            if mip:
+                glpsol_file.write("s mip " + str(rows) + " " + str(col) + " o " + obj)
+            else:
+                glpsol_file.write("s bas " + str(rows) + " " + str(col) + " f f " + obj)
+        finally:
+            if glpsol_file is not None:
+                glpsol_file.close()
         
         return 0
 
@@ -747,17 +1145,17 @@ class FlexToolRunner:
             if not timeline_data:
                 continue
 
+            timeline_index = self.indexed_timelines[timeline_id].index
             # Process each timeblock definition
             for start_time, duration in timeblocks[timeblock_id]:
                 # Find starting index in timeline
-                for idx, (time, value) in enumerate(timeline_data):
-                    if time == start_time:
-                        # Add entries for duration
-                        for step in range(int(float(duration))):
-                            if idx + step < len(timeline_data):
-                                entry = timeline_data[idx + step]
-                                active_time[period].append((entry[0], idx + step, entry[1]))
-                        break
+                idx = timeline_index.get(start_time)
+                if idx is None:
+                    continue
+                # Add entries for duration
+                for step in range(min(int(float(duration)), len(timeline_data) - idx)):
+                    entry = timeline_data[idx + step]
+                    active_time[period].append((entry[0], idx + step, entry[1]))
 
         if not active_time:
             raise ValueError(f"{current_solve}: Failed to map to timeline. Check period_timeblockSet, "
@@ -777,79 +1175,54 @@ class FlexToolRunner:
         :return:
         """
         step_lengths = []
-        period_start_pos = 0
-        period_counter = -1
-        first_period_name = list(active_time_list)[0]
-        last_period_name = list(active_time_list)[-1]
-        for period, active_time in reversed(active_time_list.items()):
-            period_counter -= 1
-            period_last = len(active_time)
-            block_last = len(active_time) - 1
-            if period == first_period_name:
-                previous_period_name = last_period_name
-            else:
-                previous_period_name = list(active_time_list)[period_counter]
-            for i, step in enumerate(reversed(active_time)):
-                j = period_last - i - 1
-                if j > 0:  # handle the first element of the period separately below
+        periods = list(active_time_list)
+        period__branch_set = set(period__branch)
+        original_period_of_branch = {}
+        for original_period, branch in period__branch:
+            original_period_of_branch[branch] = original_period
+        time_branch_of_period = {}
+        time_branches_of_period = defaultdict(set)
+        for solve_branch, time_branch in solve_branch__time_branch_list:
+            time_branch_of_period[solve_branch] = time_branch
+            time_branches_of_period[solve_branch].add(time_branch)
+        # the latest period before the current one that has the time_branch
+        last_period_with_time_branch = {}
+        for period_index, (period, active_time) in enumerate(active_time_list.items()):
+            previous_period_name = periods[period_index - 1]  # the first period jumps from the last one
+            # last step of the block of each step, a block ends before a jump over more than one step
+            block_last = [len(active_time) - 1] * len(active_time)
+            for j in range(len(active_time) - 2, -1, -1):
+                if active_time[j + 1][1] - active_time[j][1] > 1:
+                    block_last[j] = j
+                else:
+                    block_last[j] = block_last[j + 1]
+            for j, step in enumerate(active_time):
+                if j > 0:
                     jump = active_time[j][1] - active_time[j - 1][1]
                     if jump > 1:
-                        step_lengths.insert(period_start_pos, (period, step[0], active_time[j - 1][0], active_time[block_last][0], period, active_time[j - 1][0], jump))
-                        block_last = j - 1
+                        step_lengths.append((period, step[0], active_time[j - 1][0], active_time[block_last[j]][0], period, active_time[j - 1][0], jump))
                     else:
-                        step_lengths.insert(period_start_pos, (period, step[0], active_time[j - 1][0], active_time[j - 1][0], period, active_time[j - 1][0], jump))
+                        step_lengths.append((period, step[0], active_time[j - 1][0], active_time[j - 1][0], period, active_time[j - 1][0], jump))
                 else:  # first time step of the period is handled here
-                    #three options (period,period) is the realized, (period, branch) are the branches in the realized period, 
+                    #three options (period,period) is the realized, (period, branch) are the branches in the realized period,
                     #(other_period,branch): continuing branch to the next period
-                    if (period, period) not in period__branch:
-                        for i in period__branch:
-                            if i[1] == period:
-                                original_period = i[0]
-                        if (original_period,original_period) in period__branch and original_period in active_time_list.keys():
+                    if (period, period) not in period__branch_set:
+                        original_period = original_period_of_branch[period]
+                        if (original_period, original_period) in period__branch_set:
+                            #branch of a realized period, also when branching happens in the first timestep of a period
                             jump = active_time[j][1] - active_time[-1][1]
-                            step_lengths.insert(period_start_pos, (period, step[0], active_time[j - 1][0], active_time[block_last][0], period, active_time_list[period][-1][0], jump))
-                        elif (original_period,original_period) in period__branch: 
-                            #if branching happens in the first timestep of a period
-                            #find the last realized period
-                            past = False
-                            #previous_realized_period = None
-                            #for solve_period, a_t in reversed(active_time_list.items()):
-                            #    if past:
-                            #        if (solve_period, solve_period) in period__branch:
-                            #            previous_realized_period = solve_period
-                            #            break
-                            #    else:
-                            #        if solve_period == period:
-                            #            past = True
-                            jump = active_time[j][1] - active_time[-1][1]
-                            step_lengths.insert(period_start_pos, (period, step[0], active_time[j - 1][0], active_time[block_last][0], period, active_time_list[period][-1][0], jump))   
+                            step_lengths.append((period, step[0], active_time[j - 1][0], active_time[block_last[j]][0], period, active_time_list[period][-1][0], jump))
                         else:
                             #if branch continuing in the next period
                             #find the previous branch with the same time_branch
-                            for sb_tb in solve_branch__time_branch_list:
-                                if sb_tb[0] == period:
-                                    time_branch = sb_tb[1]
-                            past = False
-                            found = False
-                            previous_period_with_branch = None
-                            for solve_period, a_t in reversed(active_time_list.items()):
-                                if past:
-                                    for sb_tb in solve_branch__time_branch_list:
-                                        if sb_tb[0] == solve_period and sb_tb[1] == time_branch:
-                                            previous_period_with_branch = solve_period
-                                            found = True
-                                    if found:
-                                        break
-                                else:
-                                    if solve_period == period:
-                                        past = True
-
+                            previous_period_with_branch = last_period_with_time_branch.get(time_branch_of_period[period])
                             jump = active_time[j][1] - active_time_list[previous_period_with_branch][-1][1]
-                            step_lengths.insert(period_start_pos, (period, step[0], active_time[j - 1][0], active_time[block_last][0], previous_period_with_branch, active_time_list[previous_period_with_branch][-1][0], jump))
-                        
+                            step_lengths.append((period, step[0], active_time[j - 1][0], active_time[block_last[j]][0], previous_period_with_branch, active_time_list[previous_period_with_branch][-1][0], jump))
                     else:
                         jump = active_time[j][1] - active_time_list[previous_period_name][-1][1]
-                        step_lengths.insert(period_start_pos, (period, step[0], active_time[j - 1][0], active_time[block_last][0], previous_period_name, active_time_list[previous_period_name][-1][0], jump))
+                        step_lengths.append((period, step[0], active_time[j - 1][0], active_time[block_last[j]][0], previous_period_name, active_time_list[previous_period_name][-1][0], jump))
+            for time_branch in time_branches_of_period[period]:
+                last_period_with_time_branch[time_branch] = period
         return step_lengths
 
     def write_step_jump(self, step_lengths):
@@ -861,7 +1234,7 @@ class FlexToolRunner:
         """
 
         headers = ("period", "time", "previous", "previous_within_block", "previous_period", "previous_within_solve", "jump")
-        with open("solve_data/step_previous.csv", 'w', newline='\n') as stepfile:
+        with self.solve_data.open("solve_data/step_previous.csv", newline='\n') as stepfile:
             writer = csv.writer(stepfile, delimiter=',')
             writer.writerow(headers)
             writer.writerows(step_lengths)
@@ -883,14 +1256,13 @@ class FlexToolRunner:
                 starts[name] = (steplists[solve_names[index]][0], steplists[solve_names[index + 1]][0])
         return starts
 
-    @staticmethod
-    def write_first_steps(timeline, filename):
+    def write_first_steps(self, timeline, filename):
         """
         write to file the first step of each period
         
         :param steps: a tuple containing the period and the timestep
         """
-        with open(filename, 'w') as outfile:
+        with self.solve_data.open(filename) as outfile:
             # prepend with a header
             outfile.write('period,step\n')
             for period_name, period in timeline.items():
@@ -903,7 +1275,7 @@ class FlexToolRunner:
 
         :param steps: a tuple containing the period and the timestep
         """
-        with open(filename, 'w') as outfile:
+        with self.solve_data.open(filename) as outfile:
             # prepend with a header
             outfile.write('period,step\n')
             for period_name, period in timeline.items():
@@ -916,7 +1288,7 @@ class FlexToolRunner:
 
         :param steps: a tuple containing the period and the timestep
         """
-        with open(filename, 'w') as outfile:
+        with self.solve_data.open(filename) as outfile:
             # prepend with a header
             outfile.write('period,step\n')
             out = []
@@ -930,8 +1302,7 @@ class FlexToolRunner:
                     out = [period_name, item[0]]
                     outfile.write(out[0] + ',' + out[1] + '\n')
 
-    @staticmethod
-    def write_periods(solve, periods, filename):
+    def write_periods(self, solve, periods, filename):
         """
         write to file a list of periods based on the current solve and
         a list of tuples with the solve as the first element in the tuple
@@ -940,15 +1311,14 @@ class FlexToolRunner:
         :param periods: list of tuples with solve and periods to be printed to the file
         :return: nothing
         """
-        with open(filename, 'w') as outfile:
+        with self.solve_data.open(filename) as outfile:
             # prepend with a header
             outfile.write('period\n')
             for item in periods:
                 if item[0] == solve:
                     outfile.write(item[1] + '\n')
 
-    @staticmethod
-    def write_solve_status(first_state, last_state, nested = False):
+    def write_solve_status(self, first_state, last_state, nested = False):
         """
         make a file solve_first.csv that contains information if the current solve is the first to be run
 
@@ -957,7 +1327,7 @@ class FlexToolRunner:
 
         """
         if not nested:
-            with open("input/p_model.csv", 'w') as p_model_file:
+            with self.solve_data.open("input/p_model.csv") as p_model_file:
                 p_model_file.write("modelParam,p_model\n")
                 if first_state:
                     p_model_file.write("solveFirst,1\n")
@@ -968,7 +1338,7 @@ class FlexToolRunner:
                 else:
                     p_model_file.write("solveLast,0\n")
         else:
-            with open("solve_data/p_nested_model.csv", 'w') as p_model_file:
+            with self.solve_data.open("solve_data/p_nested_model.csv") as p_model_file:
                 p_model_file.write("modelParam,p_nested_model\n")
                 if first_state:
                     p_model_file.write("solveFirst,1\n")
@@ -979,12 +1349,11 @@ class FlexToolRunner:
                 else:
                     p_model_file.write("solveLast,0\n")
 
-    @staticmethod
-    def write_currentSolve(solve, filename):
+    def write_currentSolve(self, solve, filename):
         """
         make a file with the current solve name
         """
-        with open(filename, 'w') as solvefile:
+        with self.solve_data.open(filename) as solvefile:
             solvefile.write("solve\n")
             solvefile.write(solve + "\n")
 
@@ -1023,7 +1392,7 @@ class FlexToolRunner:
         """
         write the timesteps to be realized for the dispatch decisions
         """
-        with open("solve_data/realized_dispatch.csv", 'w') as realfile:
+        with self.solve_data.open("solve_data/realized_dispatch.csv") as realfile:
             realfile.write("period,step\n")
             for period, realized_time in realized_time_list.items():
                 if (solve,period) in self.realized_periods:
@@ -1034,37 +1403,27 @@ class FlexToolRunner:
         """
         write the timesteps to where the storage is fixed for included solves
         """
-        with open("solve_data/fix_storage_timesteps.csv", 'w') as realfile:
+        with self.solve_data.open("solve_data/fix_storage_timesteps.csv") as realfile:
             realfile.write("period,step\n")
             for period, active_time in active_time_list.items():
                 if (solve,period) in self.fix_storage_periods:
                     for i in active_time:
                         realfile.write(period+","+i[0]+"\n")
     
-    @staticmethod
-    def write_branch__period_relationship(period__branch, filename):
+    def write_branch__period_relationship(self, period__branch, filename):
         """
         write the period_branch relatioship
         """
-        with open(filename, 'w') as realfile:
+        with self.solve_data.open(filename) as realfile:
             realfile.write("period,branch\n")
             for row in period__branch:
                 realfile.write(row[0]+","+row[1]+"\n")
 
-    def write_all_branches(self,period__branch_list, solve_branch__time_branch_list):
+    def read_input_time_branches(self):
         """
-        write all branches in all solves
+        read the branches of the stochastic input timeseries
+        :return: list of the branches in the order they are first found
         """
-        branches = []
-        for solve in period__branch_list:
-                for row in period__branch_list[solve]:
-                    if row[1] not in branches:
-                        branches.append(row[1])
-        with open("solve_data/branch_all.csv", 'w') as realfile:
-            realfile.write("branch\n")
-            for branch in branches:
-                realfile.write(branch+"\n")
-
         timeseries_names=[
         'pbt_node_inflow.csv',
         'pbt_node.csv',
@@ -1074,26 +1433,35 @@ class FlexToolRunner:
         'pbt_process_sink.csv',
         'pbt_reserve__upDown__group.csv']
 
-        time_branches = []
+        time_branches = dict()
         for filename in timeseries_names:
             with open('input/'+filename, 'r') as blk:
                 filereader = csv.reader(blk, delimiter=',')
                 headers = next(filereader)
-                while True:
-                    try:
-                        datain = next(filereader)
-                        if datain[1] not in time_branches:
-                            time_branches.append(datain[1])
-                        if datain[1] == "":
-                            self.logger.error("Empty branch name in timeseries: "+ filename + " , check that there is no empty row at the end of the array")
-                            sys.exit(-1)
-                    except StopIteration:
-                        break
+                for datain in filereader:
+                    if datain[1] == "":
+                        self.logger.error("Empty branch name in timeseries: "+ filename + " , check that there is no empty row at the end of the array")
+                        sys.exit(-1)
+                    time_branches.setdefault(datain[1])
+        return list(time_branches)
 
+    def write_all_branches(self,period__branch_list, solve_branch__time_branch_list):
+        """
+        write all branches in all solves
+        """
+        branches = list(dict.fromkeys(row[1] for solve in period__branch_list for row in period__branch_list[solve]))
+        with self.solve_data.open("solve_data/branch_all.csv") as realfile:
+            realfile.write("branch\n")
+            for branch in branches:
+                realfile.write(branch+"\n")
+
+        # the input timeseries do not change between the solves, so their branches are read only once
+        if self.input_time_branches is None:
+            self.input_time_branches = self.read_input_time_branches()
+        time_branches = dict.fromkeys(self.input_time_branches)
         for solve__branch in solve_branch__time_branch_list:
-            if solve__branch[1] not in time_branches:
-                time_branches.append(solve__branch[1])
-        with open("solve_data/time_branch_all.csv", 'w') as realfile:
+            time_branches.setdefault(solve__branch[1])
+        with self.solve_data.open("solve_data/time_branch_all.csv") as realfile:
             realfile.write("time_branch\n")
             for time_branch in time_branches:
                 realfile.write(time_branch+"\n")
@@ -1108,7 +1476,7 @@ class FlexToolRunner:
                 if branch_start_time[0] == row[0] and branch_start_time[1] == row[2]:
                     time_branch_weight[row[1]] = row[4]
 
-        with open("solve_data/solve_branch_weight.csv", 'w') as realfile:
+        with self.solve_data.open("solve_data/solve_branch_weight.csv") as realfile:
             realfile.write("branch,p_branch_weight_input\n")
             for solve_branch__time_branch in solve_branch__time_branch_list:
                 #the realized part always has the weight of 1
@@ -1117,7 +1485,7 @@ class FlexToolRunner:
                 elif solve_branch__time_branch[1] in time_branch_weight.keys() and solve_branch__time_branch[0] in active_time_list.keys():
                     realfile.write(solve_branch__time_branch[0] +","+ str(time_branch_weight[solve_branch__time_branch[1]])+"\n")
 
-        with open("solve_data/solve_branch__time_branch.csv", 'w') as realfile:
+        with self.solve_data.open("solve_data/solve_branch__time_branch.csv") as realfile:
             realfile.write("period,branch\n")
             for solve_branch__time_branch in solve_branch__time_branch_list:
                 realfile.write(solve_branch__time_branch[0]+","+solve_branch__time_branch[1]+"\n")
@@ -1136,7 +1504,7 @@ class FlexToolRunner:
             if active_time_list[period][-1][0] == time_step_last and period != period_last[0]:
                 period_last.append(period)
         
-        with open("solve_data/period_last.csv", 'w') as realfile:
+        with self.solve_data.open("solve_data/period_last.csv") as realfile:
             realfile.write("period\n")
             for period in period_last:
                 realfile.write(period +"\n")
@@ -1146,7 +1514,7 @@ class FlexToolRunner:
             if period__branch[0] == period_first_of_solve:
                 period_first_of_solve_list.append(period__branch[1])
         
-        with open("solve_data/period_first_of_solve.csv", 'w') as realfile:
+        with self.solve_data.open("solve_data/period_first_of_solve.csv") as realfile:
             realfile.write("period\n")
             for period in period_first_of_solve_list:
                 realfile.write(period+"\n")
@@ -1157,7 +1525,7 @@ class FlexToolRunner:
             if period__branch[0] == period_first:
                 period_first_list.append(period__branch[1])
 
-        with open("solve_data/period_first.csv", 'w') as realfile:
+        with self.solve_data.open("solve_data/period_first.csv") as realfile:
             realfile.write("period\n")
             for period in period_first_list:
                 realfile.write(period+"\n")
@@ -1180,155 +1548,105 @@ class FlexToolRunner:
         first_timeline = self.timeblocks__timeline[first_timeblock][0]
         second_timeline = self.timeblocks__timeline[second_timeblock][0]
 
-        first_timeline_duration_from_start = OrderedDict()
-        second_timeline_duration_from_start = OrderedDict()
-        counter = 0
-        for timestep in self.timelines[first_timeline]:
-            first_timeline_duration_from_start[timestep[0]] = counter
-            counter += float(timestep[1])
-        counter = 0
-        for timestep in self.timelines[second_timeline]:
-            second_timeline_duration_from_start[timestep[0]] = counter
-            counter += float(timestep[1])
-    
-        return first_timeline_duration_from_start,second_timeline_duration_from_start
-
-    def find_previous_timestep(self, from_active_time_list, period_timestamp, this_solve, from_solve, period__branch):
-        
-        this_timeline_duration_from_start, from_timeline_duration_from_start = self.connect_two_timelines(period_timestamp[0],this_solve,from_solve, period__branch)
-
-        for row in period__branch:
-            if row[1] == period_timestamp[0]:
-                real_period = row[0]
-        from_start = this_timeline_duration_from_start[period_timestamp[1]]
-        last_timestep = from_active_time_list[real_period][0][0]
-        previous_timestep = from_active_time_list[real_period][-1][0] #last is the default, as the last timestep can be shorter and cause issues
-        for timestep in from_active_time_list[real_period]:
-            if from_timeline_duration_from_start[timestep[0]] > from_start:
-                previous_timestep = last_timestep 
-                break
-            last_timestep = timestep[0]
-        return previous_timestep
+        return self.indexed_timelines[first_timeline], self.indexed_timelines[second_timeline]
 
     def find_next_timestep(self, from_active_time_list, period_timestamp, this_solve, from_solve):
 
-        this_timeline_duration_from_start, from_timeline_duration_from_start = self.connect_two_timelines(period_timestamp[0],this_solve,from_solve,[(period_timestamp[0],period_timestamp[0])])
+        this_timeline, from_timeline = self.connect_two_timelines(period_timestamp[0],this_solve,from_solve,[(period_timestamp[0],period_timestamp[0])])
 
-        from_start = this_timeline_duration_from_start[period_timestamp[1]]
+        from_start = this_timeline.hour_from_start(period_timestamp[1])
         next_timestep = from_active_time_list[period_timestamp[0]][-1][0] #last is the default, as the last timestep can be shorter and cause issues
         for timestep in from_active_time_list[period_timestamp[0]]:
-            if from_timeline_duration_from_start[timestep[0]] >= from_start:
+            if from_timeline.hour_from_start(timestep[0]) >= from_start:
                 next_timestep = timestep[0]
                 break
         return next_timestep
 
     def write_timeline_matching_map(self, upper_active_time_list, lower_active_time_list, upper_solve, lower_solve, period__branch):
+        """
+        map each timestep of the lower solve to the last timestep of the upper solve that starts at or before it
+        the hours from the start of both timelines are looked up once per period and matched with a binary search
+        """
+        real_periods = dict()
+        for row in period__branch:
+            real_periods[row[1]] = row[0]
         matching_map = OrderedDict()
         for period, lower_active_time in lower_active_time_list.items():
-            #period_last = (period, lower_active_time[-1][0])
-            for timestep in lower_active_time:
-                period_timestep = (period, timestep[0])
-                previous_timestep = self.find_previous_timestep(upper_active_time_list, period_timestep, lower_solve, upper_solve, period__branch)
-                matching_map[period_timestep] = previous_timestep
-
-        with open("solve_data/timeline_matching_map.csv", 'w') as realfile:
+            real_period = real_periods[period]
+            lower_timeline, upper_timeline = self.connect_two_timelines(period, lower_solve, upper_solve, period__branch)
+            upper_steps = [timestep[0] for timestep in upper_active_time_list[real_period]]
+            # running maximum keeps the search equal to finding the first upper timestep that starts later
+            upper_hours = np.maximum.accumulate(np.array([upper_timeline.hour_from_start(step) for step in upper_steps]))
+            lower_hours = np.array([lower_timeline.hour_from_start(timestep[0]) for timestep in lower_active_time])
+            # the first upper timestep is used before the upper timeline starts and the last one after it ends
+            positions = np.maximum(np.searchsorted(upper_hours, lower_hours, side='right') - 1, 0)
+            for timestep, position in zip(lower_active_time, positions):
+                matching_map[(period, timestep[0])] = upper_steps[position]
+
+        with self.solve_data.open("solve_data/timeline_matching_map.csv") as realfile:
             realfile.write("period,step,upper_step\n")
             for period_timestep, upper_timestep in list(matching_map.items()):
                 realfile.write(period_timestep[0]+","+period_timestep[1]+","+ upper_timestep+"\n")
 
     def create_rolling_solves(self, solve, full_active_time_list, jump, horizon, start = None, duration = -1):
         """
-        splits the solve to overlapping sequence of solves "rolls" 
+        splits the solve to overlapping sequence of solves "rolls"
+        yields the name, active time and realized time of each roll
         """
-        active_time_lists= OrderedDict()    
-        realized_time_lists = OrderedDict()
-        solves=[]
-        starts=[]
-        jumps= []
-        horizons= []
-        duration_counter = 0
-        horizon_counter = 0
-        jump_counter = 0
-        started = False
-        ended = False
-
-        # search for the start, end and horizon time indexes
-        for period, active_time in list(full_active_time_list.items()):
-            for i, step in enumerate(active_time):
-                if not ended:
-                    if started:
-                        if duration_counter >= float(duration) and duration != -1:
-                            jumps.append(last_index)
-                            horizons.append(last_index)
-                            ended = True
-                            break
-                        if jump_counter >= float(jump):
-                            jumps.append(last_index)
-                            starts.append([period,i])
-                            jump_counter -= float(jump)
-                        if horizon_counter >= float(horizon):
-                            horizons.append(last_index)
-                            horizon_counter -= float(jump)
-                        horizon_counter += float(step[2])
-                        jump_counter += float(step[2])
-                        duration_counter += float(step[2])
-                        last_index = [period,i]
-                    else:
-                        if start == None or (start == [period, step[0]]):
-                            starts.append([period, i])
-                            started = True
-                            horizon_counter += float(step[2])
-                            jump_counter += float(step[2])
-                            duration_counter += float(step[2])
-                            last_index=[period,i]
-        if started == False:
+        periods = list(full_active_time_list.keys())
+        steps = [(period_index, i) for period_index, period in enumerate(periods) for i in range(len(full_active_time_list[period]))]
+        # search for the start, the roll starts and ends are then found from the hours elapsed since the start
+        first = None
+        for position, (period_index, i) in enumerate(steps):
+            period = periods[period_index]
+            if start == None or (start == [period, full_active_time_list[period][i][0]]):
+                first = position
+                break
+        if first == None:
             self.logger.error("Start point not found")
             sys.exit(-1)
-        # if there is start of the roll but not end, the end is the last index of the active time
-        diff = len(starts)-len(horizons)
-        for i in range(0,diff):
-            horizons.append(last_index)
-        diff = len(starts)-len(jumps)
-        for i in range(0,diff):
-            jumps.append(last_index)
-        # create the active and realized timesteps from the start and end time indexes
-        for index, roll_start in enumerate(starts): 
-            active = OrderedDict()
-            realized = OrderedDict()
-            solve_name= solve+"_roll_" + str(self.roll_counter[solve])
-            self.roll_counter[solve]+=1
-            solves.append(solve_name) 
-            if roll_start[0]==horizons[index][0]: #if the whole roll is in the same period
-                active[roll_start[0]] = full_active_time_list[roll_start[0]][roll_start[1]:horizons[index][1]+1]
-            else:
-                started = False
-                for period, active_time in list(full_active_time_list.items()):
-                    if started:
-                        if period == horizons[index][0]:
-                            active[period] = full_active_time_list[period][0:horizons[index][1]+1]
-                            break
-                        else:
-                            active[period] = full_active_time_list[period]
-                    elif period == roll_start[0]:
-                        active[roll_start[0]] = full_active_time_list[period][roll_start[1]:]
-                        started = True
-            if roll_start[0]==jumps[index][0]:
-                realized[roll_start[0]] = full_active_time_list[roll_start[0]][roll_start[1]:jumps[index][1]+1]
+        # elapsed[k] is the duration from the start to the end of the step first + k,
+        # a roll boundary is at the first step that starts when the elapsed time has reached the limit
+        elapsed = np.cumsum([float(full_active_time_list[periods[period_index]][i][2]) for period_index, i in steps[first:]])
+
+        def first_step_after(limit):
+            return first + 1 + int(np.searchsorted(elapsed, limit))
+
+        end = len(steps)
+        if duration != -1:
+            end = min(first_step_after(float(duration)), end)
+        last_index = end - 1
+
+        def time_slice(start_step, end_step):
+            # the timesteps from start_step to end_step by period
+            start_period, start_i = steps[start_step]
+            end_period, end_i = steps[end_step]
+            time_list = OrderedDict()
+            if start_period == end_period:
+                time_list[periods[start_period]] = full_active_time_list[periods[start_period]][start_i:end_i + 1]
             else:
-                started = False
-                for period, active_time in list(full_active_time_list.items()):
-                    if started:
-                        if period == jumps[index][0]:
-                            realized[period] = full_active_time_list[period][0:jumps[index][1]+1]
-                            break
-                        else:
-                            realized[period] = full_active_time_list[period]
-                    elif period == roll_start[0]:
-                        realized[period] = full_active_time_list[period][roll_start[1]:]
-                        started = True
-            active_time_lists[solve_name] = active
-            realized_time_lists[solve_name] = realized
-        return solves, active_time_lists, realized_time_lists
+                time_list[periods[start_period]] = full_active_time_list[periods[start_period]][start_i:]
+                for period in periods[start_period + 1:]:
+                    if period == periods[end_period]:
+                        time_list[period] = full_active_time_list[period][0:end_i + 1]
+                        break
+                    time_list[period] = full_active_time_list[period]
+            return time_list
+
+        roll_start = first
+        horizon_step = first
+        index = 0
+        while roll_start < end:
+            # a roll is realized until the next roll starts, and is active until the horizon
+            next_start = max(first_step_after((index + 1) * jump), roll_start + 1)
+            horizon_step = max(first_step_after(horizon + index * jump), horizon_step + 1)
+            jump_end = next_start - 1 if next_start < end else last_index
+            horizon_end = horizon_step - 1 if horizon_step < end else last_index
+            solve_name = solve + "_roll_" + str(self.roll_counter[solve])
+            self.roll_counter[solve] += 1
+            yield solve_name, time_slice(roll_start, horizon_end), time_slice(roll_start, jump_end)
+            roll_start = next_start
+            index += 1
 
     def define_solve(self, solve, parent_solve__roll = None, realized = [], start = None, duration = -1):
         complete_solves= OrderedDict() #complete_solve is for rolling, so that the rolls inherit the parameters of the whole solve
@@ -1379,14 +1697,14 @@ class FlexToolRunner:
                 start_timestep = self.find_next_timestep(full_active_time_list_own, start, parent_solve__roll[0], solve) # if the timestep is not in the lower timeline
                 period_start_timestep = [start[0],start_timestep]
             
-            roll_solves, roll_active_time_lists, roll_realized_time_lists = (
-                self.create_rolling_solves(solve, full_active_time_list, float(rolling_times[0]), float(rolling_times[1]), period_start_timestep, duration))
-            for i in roll_solves:
-                complete_solves[i] = solve
-                parent_roll_lists[i] = parent_solve__roll[1]
-
-            active_time_lists.update(roll_active_time_lists)
-            realized_time_lists.update(roll_realized_time_lists)
+            roll_solves = []
+            for roll, roll_active_time_list, roll_realized_time_list in self.create_rolling_solves(
+                    solve, full_active_time_list, float(rolling_times[0]), float(rolling_times[1]), period_start_timestep, duration):
+                roll_solves.append(roll)
+                complete_solves[roll] = solve
+                parent_roll_lists[roll] = parent_solve__roll[1]
+                active_time_lists[roll] = roll_active_time_list
+                realized_time_lists[roll] = roll_realized_time_list
             
             # used for state start constraints so it should only be in the first solve of the whole nested level
             if parent_solve__roll[1] != None:
@@ -1406,7 +1724,7 @@ class FlexToolRunner:
                     solves.append(roll)
                     #creating the start time for the rolling. This is next timestep of the roll timeline from the first [period, timestamp] of the active time of the parent roll
                     if index != 0:
-                        start = [list(roll_active_time_lists[roll].items())[0][0],list(roll_active_time_lists[roll].items())[0][1][0][0]]
+                        start = [list(active_time_lists[roll].items())[0][0],list(active_time_lists[roll].items())[0][1][0][0]]
                     else:
                         start = None
                     #upper_jump = lower_duration 
@@ -1440,16 +1758,38 @@ class FlexToolRunner:
 
         return solves, complete_solves, active_time_lists, realized_time_lists, parent_roll_lists
     
+    @staticmethod
+    def index_stochastic_branches(info):
+        """
+        index the stochastic_branches rows (period, branch, start_time, realized, weight) of a solve
+        :return: dict of period to the branches (branch, weight, realized) starting at each start time,
+                 dict of (period, start_time) to the realized branches and set of the start times with a realized branch
+        """
+        start_times = defaultdict(lambda: defaultdict(list))
+        realized_branches = defaultdict(list)
+        realized_start_times = set()
+        for row in info:
+            start_times[row[0]][row[2]].append((row[1], row[4], row[3]))
+            if row[3] == "yes":
+                realized_branches[(row[0], row[2])].append(row[1])
+                realized_start_times.add(row[2])
+        return start_times, realized_branches, realized_start_times
+
     def create_stochastic_periods(self, stochastic_branches, solves, complete_solves, active_time_lists, realized_time_lists):
         
         period__branch_lists = defaultdict(list)
         solve_branch__time_branch_lists = defaultdict(list)
         jump_lists = OrderedDict()
         branch_start_time_lists = defaultdict() 
+        # the rolls of a complete solve share its stochastic branches, so they are indexed once for each complete solve
+        branch_indexes = dict()
         for solve in solves:
             new_realized_time_list = OrderedDict()
             new_active_time_list = OrderedDict()
             info = stochastic_branches[complete_solves[solve]]
+            if complete_solves[solve] not in branch_indexes:
+                branch_indexes[complete_solves[solve]] = self.index_stochastic_branches(info)
+            period_start_times, realized_branches, realized_start_times = branch_indexes[complete_solves[solve]]
             active_time_list = active_time_lists[solve]
             realized_time_list = realized_time_lists[solve]
             branched = False
@@ -1461,10 +1801,7 @@ class FlexToolRunner:
                 break
 
             #check that the start times of the solves can be found from the stochastic_branches parameter
-            found_start = False
-            for row in info:
-                if first_step[1] == row[2] and "yes" == row[3]:
-                    found_start = True
+            found_start = first_step[1] in realized_start_times
             if found_start == False and len(info) != 0:
                 self.logger.error("A realized start time of the solve cannot be found from the stochastic_branches parameter. "+
                               "Check that stochastic_branches has a realized : yes, branch for the start of the solve" +
@@ -1475,12 +1812,9 @@ class FlexToolRunner:
                 if not branched:
                     period__branch_lists[solve].append((period, period))
                     #get all start times
-                    start_times = defaultdict(list)
-                    for row in info:
-                        if row[0]==period:
-                            start_times[row[2]].append((row[1], row[4], row[3]))
+                    start_times = period_start_times.get(period, {})
                     for step in active_time:
-                        if step[0] in start_times.keys():
+                        if step[0] in start_times:
                             branched = True
                             branch_start_time_lists[solve] = (period,step[0])
                             new_active_time_list[period] = active_time
@@ -1516,16 +1850,14 @@ class FlexToolRunner:
             for period, active_time in active_time_list.items():
                 found = 0
                 #before branching
-                for row in info:
-                    if row[0]==period and row[2] == active_time[0][0] and row[3] == 'yes':
-                        found +=1
-                        solve_branch__time_branch_lists[solve].append((period, row[1]))
+                for branch in realized_branches.get((period, active_time[0][0]), []):
+                    found +=1
+                    solve_branch__time_branch_lists[solve].append((period, branch))
                 #after branching
                 if found == 0 and branch_start_time_lists[solve] != None:
-                    for row in info:
-                        if row[0]==branch_start_time_lists[solve][0] and row[2] == branch_start_time_lists[solve][1] and row[3] == 'yes':
-                            found +=1
-                            solve_branch__time_branch_lists[solve].append((period, row[1]))
+                    for branch in realized_branches.get(branch_start_time_lists[solve], []):
+                        found +=1
+                        solve_branch__time_branch_lists[solve].append((period, branch))
                 if (branch_start_time_lists[solve] != None and found == 0) or found > 1:
                     self.logger.error("Each period should have one and only one realized branch. Found: " + str(found) + "\n")
                     sys.exit(-1)
@@ -1658,6 +1990,8 @@ class FlexToolRunner:
         period__branch_lists = OrderedDict()
         branch_start_time_lists = defaultdict()
         all_solves=[]
+        start = time.perf_counter()
+        self.profile_solve = ""
 
         try:
             os.mkdir('solve_data')
@@ -1723,13 +2057,24 @@ class FlexToolRunner:
 
         first = True
         previous_complete_solve = None
+        # the timelines of a complete solve are the same in all its rolls: build them once
+        complete_solve_timelines = dict()
+        self.record_time("define_solves", start)
         for i, solve in enumerate(all_solves):
+            self.profile_solve = solve
+            start = time.perf_counter()
             self.logger.info("Creating timelines for solve " + solve + " (" + str(i) + ")")
-            complete_active_time_lists = self.get_active_time(complete_solve[solve], self.timeblocks_used_by_solves, self.timeblocks, self.timelines, self.timeblocks__timeline)
-            self.write_full_timelines(self.stochastic_timesteps[solve], self.timeblocks_used_by_solves[complete_solve[solve]], self.timeblocks__timeline, self.timelines, 'solve_data/steps_in_timeline.csv')
+            if complete_solve[solve] not in complete_solve_timelines:
+                complete_solve_timelines[complete_solve[solve]] = (
+                    self.get_active_time(complete_solve[solve], self.timeblocks_used_by_solves, self.timeblocks, self.timelines, self.timeblocks__timeline),
+                    self.full_timeline_steps(self.timeblocks_used_by_solves[complete_solve[solve]], self.timeblocks__timeline, self.timelines))
+            complete_active_time_lists, full_timeline_steps = complete_solve_timelines[complete_solve[solve]]
+            self.write_full_timelines(self.stochastic_timesteps[solve], self.timeblocks_used_by_solves[complete_solve[solve]], self.timeblocks__timeline, self.timelines, 'solve_data/steps_in_timeline.csv', full_timeline_steps)
             self.write_active_timelines(active_time_lists[solve], 'solve_data/steps_in_use.csv')
             self.write_active_timelines(complete_active_time_lists, 'solve_data/steps_complete_solve.csv', complete = True)
             self.write_step_jump(jump_lists[solve])
+            self.record_time("timelines", start)
+            start = time.perf_counter()
             self.logger.info("Creating period data")
             self.write_period_years(period__branch_lists[solve], solve_period_history[complete_solve[solve]], 'solve_data/period_with_history.csv')
             self.write_periods(complete_solve[solve], self.realized_invest_periods, 'solve_data/realized_invest_periods_of_current_solve.csv')
@@ -1762,12 +2107,15 @@ class FlexToolRunner:
                 self.logger.info("Nested timeline matching")
                 self.write_timeline_matching_map(active_time_lists[parent_roll[solve]], active_time_lists[solve], complete_solve[parent_roll[solve]], complete_solve[solve], period__branch_lists[solve])
             else:
-                with open("solve_data/timeline_matching_map.csv", 'w') as realfile:
+                with self.solve_data.open("solve_data/timeline_matching_map.csv") as realfile:
                     realfile.write("period,step,upper_step\n")
+            self.record_time("solve_data", start)
             #if timeline created from new step_duration, all timeseries have to be averaged or summed for the new timestep
             if previous_complete_solve != complete_solve[solve]:
+                start = time.perf_counter()
                 self.logger.info("Aggregating timeline and parameters for the new step size")
                 self.create_averaged_timeseries(complete_solve[solve])
+                self.record_time("aggregate_timeseries", start)
             previous_complete_solve = complete_solve[solve]
             if solve in self.first_of_complete_solve:
                 first_of_nested_level = True
@@ -1792,20 +2140,30 @@ class FlexToolRunner:
                 self.write_empty_investment_file()
                 self.write_empty_storage_fix_file()
                 self.write_headers_for_empty_output_files('output/costs_discounted.csv', 'param_costs,costs_discounted')
+            start = time.perf_counter()
+            self.add_profile_value("write_solve_data", "files", self.solve_data.write())
+            self.record_time("write_solve_data", start)
             self.logger.info("Starting model creation")
-            exit_status = self.model_run(complete_solve[solve])
+            exit_status = self.model_run(complete_solve[solve], solve)
             if exit_status == 0:
                 self.logger.info('Success!')
             else:
                 self.logger.error(f'Error: {exit_status}')
                 sys.exit(-1)
+            #the kept highspy instance (and the copy of its LP) is not needed once the last roll of the solve is done
+            if last_of_nested_level:
+                self.highs_models.pop(complete_solve[solve], None)
             #if multiple storage solve levels, save the storage fix of this level:
             if any(complete_solve[solve] == solve_period[0] for solve_period in self.fix_storage_periods):
                 shutil.copy("solve_data/fix_storage_quantity.csv","solve_data/fix_storage_quantity_"+ complete_solve[solve]+".csv")
                 shutil.copy("solve_data/fix_storage_price.csv", "solve_data/fix_storage_price_"+ complete_solve[solve]+".csv")
                 shutil.copy("solve_data/fix_storage_usage.csv","solve_data/fix_storage_usage_"+ complete_solve[solve]+".csv")
+            self.write_profile()
+            self.write_solve_results()
 
         #produce periodic data as post-process for rolling window solves
+        self.profile_solve = ""
+        start = time.perf_counter()
         post_process_results = False
         for solve in complete_solve.keys():
             if self.solve_modes[complete_solve[solve]] == "rolling_window":
@@ -1851,13 +2209,46 @@ class FlexToolRunner:
         os.remove("output/annualized_investment_costs__period.csv")
         os.remove("output/group_node__period__t.csv")
         os.remove("output/unit_curtailment_share__outputNode__period__t.csv")
+        self.record_time("post_process", start)
+        self.write_profile()
         if len(self.model_solve) > 1:
             self.logger.error(
                 f'Trying to run more than one model - not supported. The results of the first model are retained.')
             sys.exit(-1)
 
+    def open_value_cache(self, db, input_db_url, scenario_name):
+        if self.value_cache_dir:
+            return DecodedValueCache(db, input_db_url, None, cache_dir=self.value_cache_dir)
+        return DecodedValueCache(db, input_db_url, scenario_name)
+
+    def load_parameters(self, db, classes):
+        """
+        fetch the entities and the parameter values of the given classes in one pass and index them
+        by (class, parameter) and entity name, so that the dict helpers do not query the database per entity
+        :param db: database mapping to read from
+        :param classes: entity class names to fetch, classes already in the index are skipped
+        """
+        for cl in classes:
+            if cl in self.entity_index:
+                continue
+            self.entity_index[cl] = db.get_entity_items(entity_class_name=cl)
+            for param in db.get_parameter_value_items(entity_class_name=cl):
+                self.parameter_index[(cl, param["parameter_definition_name"])][param["entity_name"]].append(param)
+
+    def indexed_parameters(self, db, cl, par):
+        """
+        yield (entity, parameter value items) of a class parameter in entity order from the parameter index
+        """
+        self.load_parameters(db, [cl])
+        params_by_entity = self.parameter_index.get((cl, par), {})
+        for entity in self.entity_index[cl]:
+            params = params_by_entity.get(entity["name"])
+            if params:
+                yield entity, params
+
     def entities_to_dict(self, db, cl, mode):
-        entities = db.get_entity_items(entity_class_name=cl)
+        self.load_parameters(db, [cl])
+        entities = self.entity_index[cl]
         if mode == "defaultdict":
             result = defaultdict(list)
         elif mode == "dict":
@@ -1871,21 +2262,15 @@ class FlexToolRunner:
 
 
     def params_to_dict(self, db, cl, par, mode, str_to_list=False):
-        entities = db.get_entity_items(entity_class_name=cl)
-        params = db.get_parameter_value_items(entity_class_name=cl,
-                                                 parameter_definition_name=par)
         if mode == "defaultdict":
             result = defaultdict(list)
         elif mode == "dict":
             result = dict()
         elif mode == "list":
             result = []
-        for entity in entities:
-            params = db.get_parameter_value_items(entity_class_name=cl,
-                                                  entity_name=entity["name"],
-                                                  parameter_definition_name=par)
+        for entity, params in self.indexed_parameters(db, cl, par):
             for param in params:
-                param_value = api.from_database(param["value"], param["type"])
+                param_value = self.value_cache.parsed_value(param)
                 if mode == "defaultdict" or mode == "dict":
                     if isinstance(param_value, api.Map):
                         if isinstance(param_value.values[0], float):
@@ -1897,7 +2282,7 @@ class FlexToolRunner:
                         else:
                             raise TypeError("params_to_dict function does not handle other values than floats and strings")
                     elif isinstance(param_value, api.Array):
-                        result[entity["name"]] = param_value.values
+                        result[entity["name"]] = list(param_value.values)  # a copy, the solve lists are modified later
                     elif isinstance(param_value, float):
                         result[entity["name"]] = str(param_value)
                     elif isinstance(param_value, str):
@@ -1913,440 +2298,696 @@ class FlexToolRunner:
 
         return result
 
-    def write_input(self, input_db_url, scenario_name=None):
+    def write_input(self, input_db_url, scenario_name=None, workers=1, incremental=True):
+        """
+        write the scenario filtered input data to the input/*.csv files read by the model
+        :param input_db_url: url of the input database
+        :param scenario_name: scenario used to filter the database
+        :param workers: number of threads writing the files concurrently, 1 writes them in sequence
+        :param incremental: skip the files whose fingerprint matches the one in input_manifest.json
+        """
+        start = time.perf_counter()
         if scenario_name:
             scen_config = api.filters.scenario_filter.scenario_filter_config(scenario_name)
         with (DatabaseMapping(input_db_url) as db):
             if scenario_name:
                 api.filters.scenario_filter.scenario_filter_from_dict(db, scen_config)
-            if not os.path.exists("input"):
-                os.makedirs("input", exist_ok=True)
-            write_default_values(db, [("node", "penalty_up"), ("node", "penalty_down")],
-                                 "class,paramName,default_value", "input/default_values.csv",
-                                 filter_in_type=["float", "str", "bool"])
-            write_parameter(db, [("commodity", "price")], "commodity,commodityParam,time,pt_commodity",
-                            "input/pt_commodity.csv", filter_in_type=["1d_map"], filter_out_index="period", param_print=True)
-            write_parameter(db, [("commodity", "price"), ("commodity", "co2_content")], "commodity,commodityParam,p_commodity",
-                            "input/p_commodity.csv", filter_in_type=["float", "str"], param_print=True)
-            write_parameter(db, [("commodity", "price")], "commodity,commodityParam,period,pd_commodity",
-                            "input/pd_commodity.csv", filter_in_type=["1d_map"], filter_out_index="time", param_print=True)
-            write_entity(db, ["commodity"], "commodity", "input/commodity.csv")
-            write_entity(db, ["commodity__node"], "commodity,node", "input/commodity__node.csv")
-            write_parameter(db, [("constraint", "sense")], "constraint,sense", "input/constraint__sense.csv")
-            write_parameter(db, [("constraint", "constant")], "constraint,p_constraint_constant",
-                            "input/p_constraint_constant.csv")
-            write_parameter(db, [("model", "debug")], "debug", "input/debug.csv")
-            write_entity(db, ["node", "unit", "connection"], "entity", "input/entity.csv")
-            write_parameter(db, [("node", "invest_method"), ("unit", "invest_method"), ("connection", "invest_method")],
-                            "entity,invest_method", "input/entity__invest_method.csv")
-            write_parameter(db, [("node", "lifetime_method"), ("unit", "lifetime_method"),
-                                 ("connection", "lifetime_method")], "entity,lifetime_method",
-                            "input/entity__lifetime_method.csv")
-            write_entity(db, ["group"], "group", "input/group.csv")
-            write_parameter(db, [("group", "co2_method")], "group,co2_method", "input/group__co2_method.csv")
-            write_parameter(db, [("group", "invest_method")], "group,invest_method", "input/group__invest_method.csv")
-            write_parameter(db, [("group", "loss_share_type")], "group,loss_share_type",
-                            "input/group__loss_share_type.csv")
-            write_entity(db, ["group__node"], "group,node", "input/group__node.csv")
-            write_entity(db, ["group__unit", "group__connection"], "group,process", "input/group__process.csv")
-            write_entity(db, ["group__unit__node", "group__connection__node"], "group,process,node",
-                         "input/group__process__node.csv")
-            write_parameter(db, [("group", "has_capacity_margin")], "groupCapacityMargin",
-                            "input/groupCapacityMargin.csv", filter_in_value="yes", no_value=True)
-            write_parameter(db, [("group", "include_stochastics")], "group", "input/groupIncludeStochastics.csv",
-                            filter_in_value="yes", no_value=True)
-            write_parameter(db, [("group", "has_inertia")], "groupInertia", "input/groupInertia.csv",
-                            filter_in_value="yes", no_value=True)
-            write_parameter(db, [("group", "output_node_flows")], "groupOutputNodeFlows",
-                            "input/groupOutputNodeFlows.csv", filter_in_value="yes", no_value=True)
-            write_parameter(db, [("group", "output_aggregate_flows")], "groupOutputAggregateFlows",
-                            "input/groupOutputAggregateFlows.csv", filter_in_value="yes", no_value=True)
-            write_parameter(db, [("model", "exclude_entity_outputs")], "value", "input/exclude_entity_outputs.csv")
-            write_parameter(db, [("model", "solves")], "model,solve", "input/model__solve.csv")
-            write_entity(db, ["node"], "node", "input/node.csv")
-            write_parameter(db, [("node", "constraint_capacity_coefficient")],
-                            "node,constraint,p_node_constraint_capacity_coefficient",
-                            "input/p_node_constraint_capacity_coefficient.csv")
-            write_parameter(db, [("node", "constraint_state_coefficient")],
-                            "node,constraint,p_node_constraint_state_coefficient",
-                            "input/p_node_constraint_state_coefficient.csv")
-            write_parameter(db, [("node", "has_balance")], "nodeBalance", "input/nodeBalance.csv",
-                            filter_in_value="yes", no_value=True)
-            write_parameter(db, [("node", "inflow_method")], "node,inflow_method", "input/node__inflow_method.csv")
-            write_parameter(db, [("node", "node_type")], "node,node_type", "input/node__node_type.csv")
-            write_parameter(db, [("node", "profile_method")], "node,profile,profile_method",
-                            "input/node__profile__profile_method.csv")
-            write_parameter(db, [("node", "has_storage")], "nodeState", "input/nodeState.csv", filter_in_value="yes",
-                            no_value=True)
-            write_parameter(db, [("node", "storage_binding_method")], "node,storage_binding_method",
-                            "input/node__storage_binding_method.csv")
-            write_parameter(db, [("node", "storage_nested_fix_method")], "node,storage_nested_fix_method",
-                            "input/node__storage_nested_fix_method.csv")
-            write_parameter(db, [("node", "storage_solve_horizon_method")], "node,storage_solve_horizon_method",
-                            "input/node__storage_solve_horizon_method.csv")
-            write_parameter(db, [("node", "storage_start_end_method")], "node,storage_start_end_method",
-                            "input/node__storage_start_end_method.csv")
-            write_parameter(db, [("node", "penalty_down"), ("node", "self_discharge_loss"), ("node", "availability"),
-                                 ("node", "storage_state_reference_value")], "node,nodeParam,time,pt_node",
-                            "input/pt_node.csv", filter_in_type=["1d_map", "array", "time_series"],
-                            filter_out_index="period", param_print=True)
-            write_parameter(db, [("node", "penalty_down"), ("node", "self_discharge_loss"), ("node", "availability"),
-                                 ("node", "storage_state_reference_value")],
-                            "node,nodeParam,branch,time_start,time,pt_node", "input/pbt_node.csv",
-                            filter_in_type=["3d_map"], param_print=True)
-            write_parameter(db, [("node", "inflow")], "node,time,pt_node_inflow", "input/pt_node_inflow.csv",
-                            filter_in_type=["1d_map", "array", "time_series"], filter_out_index="period")
-            write_parameter(db, [("node", "inflow")], "node,branch,time_start,time,pbt_node_inflow",
-                            "input/pbt_node_inflow.csv", filter_in_type=["3d_map"])
-            write_parameter(db, [("node", "annual_flow"),
-                                 ("node", "peak_inflow"),
-                                 ("node", "invest_forced"),
-                                 ("node", "invest_max_period"),
-                                 ("node", "invest_min_period"),
-                                 ("node", "retire_forced"),
-                                 ("node", "retire_max_period"),
-                                 ("node", "retire_min_period"),
-                                 ("node", "invest_cost"),
-                                 ("node", "salvage_value"),
-                                 ("node", "interest_rate"),
-                                 ("node", "lifetime"),
-                                 ("node", "fixed_cost"),
-                                 ("node", "storage_state_reference_price"),
-                                 ("node", "availability"),
-                                 ("node", "penalty_up"),
-                                 ("node", "penalty_down"),
-                                 ("node", "cumulative_max_capacity"),
-                                 ("node", "cumulative_min_capacity"),
-                                 ("node", "self_discharge_loss"),
-                                 ("node", "existing"),
-                                 ("node", "storage_state_reference_value")], "node,nodeParam,period,pd_node",
-                            "input/pd_node.csv", filter_in_type=["1d_map"], filter_out_index="time", param_print=True)
-            write_entity(db, ["unit", "connection"], "process", "input/process.csv")
-            write_entity(db, ["connection"], "process_connection", "input/process_connection.csv")
-            write_parameter(db, [("unit__outputNode", "coefficient")], "process,sink,p_process_sink_coefficient",
-                            "input/p_process_sink_coefficient.csv", filter_in_type=["float", "str", "bool"])
-            write_parameter(db, [("unit__inputNode", "coefficient")], "process,source,p_process_source_coefficient",
-                            "input/p_process_source_coefficient.csv", filter_in_type=["float", "str", "bool"])
-            write_parameter(db, [("connection", "is_DC")], "process", "input/process_nonSync_connection.csv",
-                            filter_in_value="yes", no_value=True)
-            write_entity(db, ["unit"], "process_unit", "input/process_unit.csv")
-            write_parameter(db, [("unit__outputNode", "other_operational_cost")], "process,sink,sourceSinkTimeParam,time,pt_process_sink",
-                            "input/pt_process_sink.csv", filter_in_type=["1d_map"], filter_out_index="period", param_print=True)
-            write_parameter(db, [("unit__outputNode", "other_operational_cost")], "process,sink,sourceSinkPeriodParam,period,pd_process_sink",
-                            "input/pd_process_sink.csv", filter_in_type=["1d_map"], filter_out_index="time", param_print=True)
-            write_parameter(db, [("unit__outputNode", "other_operational_cost")],
-                            "process,sink,sourceSinkTimeParam,branch,time_start,time,pbt_process_sink", "input/pbt_process_sink.csv",
-                            filter_in_type=["3d_map"], param_print=True)
-            write_parameter(db, [("unit__inputNode", "other_operational_cost")],
-                            "process,source,sourceSinkTimeParam,time,pt_process_source", "input/pt_process_source.csv",
-                            filter_in_type=["1d_map"], filter_out_index="period", param_print=True)
-            write_parameter(db, [("unit__inputNode", "other_operational_cost")],
-                            "process,source,sourceSinkPeriodParam,period,pd_process_source", "input/pd_process_source.csv",
-                            filter_in_type=["1d_map"], filter_out_index="time", param_print=True)
-            write_parameter(db, [("unit__inputNode", "other_operational_cost")],
-                            "process,source,sourceSinkTimeParam,branch,time_start,time,pbt_process_source", "input/pbt_process_source.csv",
-                            filter_in_type=["3d_map"], param_print=True)
-            write_parameter(db, [("connection__profile", "profile_method")], "process,profile,profile_method",
-                            "input/process__profile__profile_method.csv")
-            write_parameter(db, [("unit__outputNode", "ramp_method"), ("unit__inputNode", "ramp_method")],
-                            "process,node,ramp_method", "input/process__node__ramp_method.csv")
-            write_parameter(db, [("unit", "startup_method"), ("connection", "startup_method")],
-                            "process,startup_method", "input/process__startup_method.csv")
-            write_parameter(db, [("unit", "conversion_method"), ("connection", "transfer_method")], "process,ct_method",
-                            "input/process__ct_method.csv")
-            write_entity(db, ["reserve__upDown__unit__node", "reserve__upDown__connection__node"], "process,reserve,upDown,node",
-                            "input/process__reserve__upDown__node.csv", entity_dimens=[[2,0,1,3], [2,0,1,3]])
-            write_parameter(db, [("profile", "profile")], "profile,time,pt_profile", "input/pt_profile.csv",
-                            filter_in_type=["1d_map"], filter_out_index="period")
-            write_parameter(db, [("profile", "profile")], "profile,branch,time_start,time,pbt_profile", "input/pbt_profile.csv",
-                            filter_in_type=["3d_map"])
-            write_parameter(db, [("profile", "profile")], "profile,period,pd_profile", "input/pd_profile.csv",
-                            filter_in_type=["1d_map"], filter_out_index="time")
-            write_parameter(db, [("profile", "profile")], "profile,p_profile", "input/p_profile.csv",
-                            filter_in_type=["float", "str", "bool"])
-            write_entity(db, ["profile"], "profile", "input/profile.csv")
-            write_parameter(db, [("reserve__upDown__group", "increase_reserve_ratio"),
-                                 ("reserve__upDown__group", "penalty_reserve"),
-                                 ("reserve__upDown__group", "reservation")],
-                            "reserve,upDown,group,reserveParam,p_reserve_upDown_group",
-                            "input/p_reserve__upDown__group.csv", filter_in_type=["float", "str", "bool"], param_print=True)
-            write_parameter(db, [("reserve__upDown__group", "reservation")],
-                            "reserve,upDown,group,reserveParam,time,pt_reserve_upDown_group",
-                            "input/pt_reserve__upDown__group.csv", filter_in_type=["1d_map"], filter_out_index="period", param_print=True)
-            write_parameter(db, [("reserve__upDown__group", "reservation")],
-                            "reserve,upDown,group,reserveParam,branch,time_start,time,pbt_reserve_upDown_group",
-                            "input/pbt_reserve__upDown__group.csv", filter_in_type=["3d_map"], param_print=True)
-            write_parameter(db, [("reserve__upDown__group", "reserve_method")], "reserve,upDown,group,method",
-                            "input/reserve__upDown__group__method.csv")
-            write_parameter(db, [("solve", "solver")], "solve,solver", "input/solver.csv")
-            write_parameter(db, [("solve", "timeline_hole_multiplier")], "solve,p_hole_multiplier",
-                            "input/solve_hole_multiplier.csv")
-            write_parameter(db, [("solve", "solver_precommand")], "solve,solver_precommand",
-                            "input/solver_precommand.csv")
-            write_parameter(db, [("solve", "solver_arguments")], "solve,arguments", "input/solver_arguments.csv")
-            write_parameter(db, [("solve", "highs_method"),
-                                 ("solve", "highs_parallel"),
-                                 ("solve", "highs_presolve"),
-                                 ("solve", "solve_mode")],
-                            "param,solve,value", "input/solve_mode.csv", param_print=True, param_loc = 0)
-            write_parameter(db, [("solve", "contains_solves")], "solve,include_solve",
-                            "input/solve__contains_solve.csv")
-            write_parameter(db, [("solve", "realized_periods")], "solve,roll,period",
-                            "input/solve__realized_period_2d_map.csv", filter_in_type=["2d_map"], no_value=True)
-            write_parameter(db, [("solve", "fix_storage_periods")], "solve,roll,period",
-                            "input/solve__fix_storage_period_2d_map.csv", filter_in_type=["2d_map"], no_value=True)
-            write_parameter(db, [("solve", "invest_periods")], "solve,roll,period",
-                            "input/solve__invest_period_2d_map.csv", filter_in_type=["2d_map"], no_value=True)
-            write_parameter(db, [("solve", "realized_periods")], "solve,period", "input/solve__realized_period.csv",
-                            filter_in_type=["array", "1d_map"])
-            write_parameter(db, [("solve", "realized_invest_periods")], "solve,invest_realized_period",
-                            "input/solve__realized_invest_period.csv", filter_in_type=["array", "1d_map"])
-            write_parameter(db, [("solve", "realized_invest_periods")], "solve,roll,period",
-                            "input/solve__realized_invest_period_2d_map.csv", filter_in_type=["2d_map"], no_value=True)
-            write_parameter(db, [("solve", "fix_storage_periods")], "solve,period",
-                            "input/solve__fix_storage_period.csv", filter_in_type=["array", "1d_map"])
-            write_parameter(db, [("solve", "invest_periods")], "solve,period", "input/solve__invest_period.csv",
-                            filter_in_type=["array", "1d_map"])
-            write_parameter(db, [("solve", "years_represented")], "solve,period,years_represented",
-                            "input/solve__period__years_represented.csv")
-            write_parameter(db, [("solve", "stochastic_branches")], "solve,period,branch,start_time,realized,weight",
-                            "input/stochastic_branches.csv")
-            write_parameter(db, [("timeline", "timestep_duration")], "timeline,timestep,duration", "input/timeline.csv")
-            write_parameter(db, [("timeline", "timeline_duration_in_years")], "timeline,p_timeline_duration_in_years",
-                            "input/timeline_duration_in_years.csv")
-            write_parameter(db, [("timeblockSet", "block_duration")], "timeblocks,start,duration", "input/timeblocks.csv")
-            write_entity(db, ["timeblockSet__timeline"], "timeblocks,timeline", "input/timeblocks__timeline.csv")
-            write_parameter(db, [("solve", "period_timeblockSet")], "solve,roll,period,timeblocks",
-                            "input/timeblocks_in_use_2d.csv", filter_in_type=["2d_map"])
-            write_parameter(db, [("solve", "period_timeblockSet")], "solve,period,timeblocks", "input/timeblocks_in_use.csv",
-                            filter_in_type=["1d_map"])
-            write_parameter(db, [("timeblockSet", "new_stepduration")], "timeblockSet,step_duration",
-                            "input/timeblockSet__new_stepduration.csv", filter_out_index="time")
-            write_parameter(db, [("unit__outputNode")], "process,sink,param", "input/unit__sinkNode__param.csv",
-                            filter_in_type=["1d_map"], filter_out_index="period", param_print=True)
-            write_parameter(db, [("unit__inputNode")], "process,source,param", "input/unit__sourceNode__param.csv",
-                            filter_out_index="period", param_print=True)
-            write_parameter(db, [("unit", "efficiency"),
-                                 ("unit", "efficiency_at_min_load"),
-                                 ("unit", "min_load"),
-                                 ("unit", "other_operational_cost"),
-                                 ("unit", "availability"),
-                                 ("connection", "efficiency"),
-                                 ("connection", "efficiency_at_min_load"),
-                                 ("connection", "min_load"),
-                                 ("connection", "other_operational_cost"),
-                                 ("connection", "availability"),
-                                ],
-                            "process,processParam,time,pt_process", "input/pt_process.csv", filter_in_type=["1d_map"],
-                            filter_out_index="period", param_print=True)
-            write_entity(db, ["unit__inputNode", "connection__node__node"], "process,source", "input/process__source.csv",
-                         entity_dimens=[[0,1], [0,1]])
-            write_parameter(db, [("unit__outputNode", "is_non_synchronous")], "process,sink",
-                            "input/process__sink_nonSync_unit.csv", filter_in_value="yes", no_value=True)
-            write_entity(db, ["unit__outputNode", "connection__node__node"], "process,sink", "input/process__sink.csv",
-                         entity_dimens=[[0,1], [0,2]])
-            write_parameter(db, [("unit__node__profile", "profile_method")], "process,node,profile,profile_method",
-                            "input/process__node__profile__profile_method.csv")
-            write_parameter(db, [("unit__inputNode")], "process,source,sourceSinkParam,p_process_source",
-                            "input/p_process_source.csv", param_print=True)
-            write_parameter(db, [("unit__outputNode")], "process,sink,sourceSinkParam,p_process_sink",
-                            "input/p_process_sink.csv", param_print=True)
-            write_parameter(db, [("reserve__upDown__unit__node", "increase_reserve_ratio"),
-                                 ("reserve__upDown__unit__node", "large_failure_ratio"),
-                                 ("reserve__upDown__unit__node", "max_share"),
-                                 ("reserve__upDown__unit__node", "reliability"),
-                                 ("reserve__upDown__connection__node", "increase_reserve_ratio"),
-                                 ("reserve__upDown__connection__node", "large_failure_ratio"),
-                                 ("reserve__upDown__connection__node", "max_share"),
-                                 ("reserve__upDown__connection__node", "reliability")
-                                 ],
-                            "process,reserve,upDown,node,reserveParam,p_process_reserve_upDown_node",
-                            "input/p_process__reserve__upDown__node.csv",
-                            filter_in_type=["float", "str", "bool"], param_print=True, dimens = [1, 2, 0, 3])
-            write_parameter(db, [("unit__outputNode", "constraint_flow_coefficient"),
-                                 ("unit__inputNode", "constraint_flow_coefficient"),
-                                 ("connection__node", "constraint_flow_coefficient")],
-                            "process,node,constraint,p_process_node_constraint_flow_coefficient",
-                            "input/p_process_node_constraint_flow_coefficient.csv", filter_in_type=["1d_map"])
-            write_parameter(db, [("unit", "constraint_capacity_coefficient"),
-                                 ("connection", "constraint_capacity_coefficient")],
-                            "process,constraint,p_process_constraint_capacity_coefficient",
-                            "input/p_process_constraint_capacity_coefficient.csv", filter_in_type=["1d_map"])
-            write_parameter(db, [("unit", "availability"),
-                                 ("unit", "cumulative_max_capacity"),
-                                 ("unit", "cumulative_min_capacity"),
-                                 ("unit", "efficiency"),
-                                 ("unit", "efficiency_at_min_load"),
-                                 ("unit", "existing"),
-                                 ("unit", "fixed_cost"),
-                                 ("unit", "interest_rate"),
-                                 ("unit", "invest_cost"),
-                                 ("unit", "invest_max_total"),
-                                 ("unit", "invest_min_total"),
-                                 ("unit", "lifetime"),
-                                 ("unit", "min_downtime"),
-                                 ("unit", "min_load"),
-                                 ("unit", "min_uptime"),
-                                 ("unit", "retire_max_total"),
-                                 ("unit", "retire_min_total"),
-                                 ("unit", "salvage_value"),
-                                 ("unit", "startup_cost"),
-                                 ("unit", "virtual_unitsize"),
-                                 ("connection", "availability"),
-                                 ("connection", "cumulative_max_capacity"),
-                                 ("connection", "cumulative_min_capacity"),
-                                 ("connection", "efficiency"),
-                                 ("connection", "existing"),
-                                 ("connection", "fixed_cost"),
-                                 ("connection", "interest_rate"),
-                                 ("connection", "invest_cost"),
-                                 ("connection", "invest_max_total"),
-                                 ("connection", "invest_min_total"),
-                                 ("connection", "lifetime"),
-                                 ("connection", "other_operational_cost"),
-                                 ("connection", "retire_max_total"),
-                                 ("connection", "retire_min_total"),
-                                 ("connection", "salvage_value"),
-                                 ("connection", "startup_cost"),
-                                 ("connection", "virtual_unitsize")
-                                ],
-                            "process,processParam,p_process", "input/p_process.csv",
-                            filter_in_type=["float", "str", "bool"], param_print=True)
-            write_parameter(db, [("node", "annual_flow"),
-                                 ("node", "availability"),
-                                 ("node", "cumulative_max_capacity"),
-                                 ("node", "cumulative_min_capacity"),
-                                 ("node", "existing"),
-                                 ("node", "fixed_cost"),
-                                 ("node", "inflow"),
-                                 ("node", "interest_rate"),
-                                 ("node", "invest_cost"),
-                                 ("node", "invest_forced"),
-                                 ("node", "invest_max_total"),
-                                 ("node", "invest_min_total"),
-                                 ("node", "lifetime"),
-                                 ("node", "peak_inflow"),
-                                 ("node", "penalty_down"),
-                                 ("node", "penalty_up"),
-                                 ("node", "retire_max_total"),
-                                 ("node", "retire_min_total"),
-                                 ("node", "salvage_value"),
-                                 ("node", "self_discharge_loss"),
-                                 ("node", "storage_state_end"),
-                                 ("node", "storage_state_reference_price"),
-                                 ("node", "storage_state_reference_value"),
-                                 ("node", "storage_state_start"),
-                                 ("node", "storate_state_end"),
-                                 ("node", "virtual_unitsize")
-                                ], "node,nodeParam,p_node", "input/p_node.csv",
-                            filter_in_type=["float", "str", "bool"], param_print=True)
-            write_parameter(db, [("group__unit", "groupParam"), ("group__connection", "groupParam")],
-                            "group,process,groupParam,p_group_process_s",
-                            "input/p_group__process.csv", param_print=True)
-            write_parameter(db, [("group", "groupParam"),
-                                 ("group", "capacity_margin"),
-                                 ("group", "co2_max_total"),
-                                 ("group", "co2_price"),
-                                 ("group", "inertia_limit"),
-                                 ("group", "invest_max_total"),
-                                 ("group", "invest_min_total"),
-                                 ("group", "max_cumulative_flow"),
-                                 ("group", "max_instant_flow"),
-                                 ("group", "min_cumulative_flow"),
-                                 ("group", "min_instant_flow"),
-                                 ("group", "non_synchronous_limit"),
-                                 ("group", "penalty_capacity_margin"),
-                                 ("group", "penalty_inertia"),
-                                 ("group", "penalty_non_synchronous"),
-                                ], "group,groupParam,p_group", "input/p_group.csv",
-                            filter_in_type=["float", "str", "bool"], param_print=True)
-            write_parameter(db, [("unit", "invest_forced"),
-                                 ("unit", "invest_max_period"),
-                                 ("unit", "invest_min_period"),
-                                 ("unit", "retire_forced"),
-                                 ("unit", "retire_max_period"),
-                                 ("unit", "retire_min_period"),
-                                 ("unit", "invest_cost"),
-                                 ("unit", "salvage_value"),
-                                 ("unit", "interest_rate"),
-                                 ("unit", "lifetime"),
-                                 ("unit", "fixed_cost"),
-                                 ("unit", "other_operational_cost"),
-                                 ("unit", "existing"),
-                                 ("unit", "cumulative_max_capacity"),
-                                 ("unit", "cumulative_min_capacity"),
-                                 ("connection", "invest_forced"),
-                                 ("connection", "invest_max_period"),
-                                 ("connection", "invest_min_period"),
-                                 ("connection", "retire_forced"),
-                                 ("connection", "retire_max_period"),
-                                 ("connection", "retire_min_period"),
-                                 ("connection", "invest_cost"),
-                                 ("connection", "salvage_value"),
-                                 ("connection", "interest_rate"),
-                                 ("connection", "lifetime"),
-                                 ("connection", "fixed_cost"),
-                                 ("connection", "other_operational_cost"),
-                                 ("connection", "existing"),
-                                 ("connection", "cumulative_max_capacity"),
-                                 ("connection", "cumulative_min_capacity"),
-                                ],
-                            "process,processParam,period,pd_process", "input/pd_process.csv", filter_in_type=["1d_map"],
-                            filter_out_index="time", param_print=True)
-            write_parameter(db, [("model", "discount_rate")], "model,p_discount_rate", "input/p_discount_rate.csv")
-            write_parameter(db, [("model", "discount_offset_operations")], "model,p_discount_offset_operations",
-                            "input/p_discount_offset_operations.csv")
-            write_parameter(db, [("model", "discount_offset_investment")], "model,p_discount_offset_investment",
-                            "input/p_discount_offset_investment.csv")
-            write_parameter(db, [("group", "co2_max_period"),
-                                 ("group", "co2_price"),
-                                 ("group", "inertia_limit"),
-                                 ("group", "invest_max_period"),
-                                 ("group", "invest_min_period"),
-                                 ("group", "invest_min_total"),
-                                 ("group", "max_cumulative_flow"),
-                                 ("group", "max_instant_flow"),
-                                 ("group", "min_cumulative_flow"),
-                                 ("group", "min_instant_flow"),
-                                 ("group", "non_synchronous_limit"),
-                                 ("group", "penalty_capacity_margin"),
-                                 ("group", "penalty_inertia"),
-                                 ("group", "penalty_non_synchronous"),
-                                 ], "group,groupParam,period,pd_group", "input/pd_group.csv",
-                            filter_in_type=["1d_map"], filter_out_index="time", param_print=True)
-            write_parameter(db, [("group", "co2_price"),
-                                 ("group", "max_instant_flow"),
-                                 ("group", "min_instant_flow"),
-                                ], "group,groupParam,period,pt_group", "input/pt_group.csv",
-                            filter_in_type=["1d_map"], filter_out_index="period", param_print=True)
-            write_parameter(db, [("unit", "efficiency"),
-                                 ("unit", "efficiency_at_min_load"),
-                                 ("unit", "min_load"),
-                                 ("unit", "other_operational_cost"),
-                                 ("unit", "availability"),
-                                 ("connection", "efficiency"),
-                                 ("connection", "efficiency_at_min_load"),
-                                 ("connection", "min_load"),
-                                 ("connection", "other_operational_cost"),
-                                 ("connection", "availability")
-                                ],
-                            "process,processParam,branch,time_start,time,pbt_process", "input/pbt_process.csv",
-                            filter_in_type=["3d_map"], param_print=True)
-            write_parameter(db, [("model", "exclude_entity_outputs"),
-                                 ("model", "output_connection__node__node_flow_t"),
-                                 ("model", "output_connection_flow_separate"),
-                                 ("model", "output_horizon"),
-                                 ("model", "output_ramp_envelope"),
-                                 ("model", "output_unit__node_flow_t"),
-                                 ("model", "output_unit__node_ramp_t"),
-                                ], "output,value", "input/optional_outputs.csv", param_print=True, no_entity=True)
-            write_parameter(db, [("group", "output_results")], "groupOutput", "input/groupOutput.csv",
-                            filter_in_value="yes", no_value=True)
-            write_parameter(db, [("group", "has_non_synchronous")], "groupNonSync", "input/groupNonSync.csv",
-                            filter_in_value="yes", no_value=True)
-            write_default_values(db, [("model", "version")], "version", "input/db_version.csv",
-                            filter_in_type=["float", "str", "bool"], only_value=True)
+            # reuse the values decoded by the constructor when the database has not been committed to since
+            value_cache = self.value_cache
+            if value_cache.revision != DecodedValueCache.revision_key(db, input_db_url, None if self.value_cache_dir else scenario_name):
+                value_cache = self.open_value_cache(db, input_db_url, scenario_name)
+            snapshot = InputSnapshot(db, value_cache)
+        value_cache.save()
+        if not os.path.exists("input"):
+            os.makedirs("input", exist_ok=True)
+        # each job writes its own file from the snapshot, so the jobs are independent of each other
+        jobs = [
+            partial(write_default_values, snapshot, [("node", "penalty_up"), ("node", "penalty_down")],
+                    "class,paramName,default_value", "input/default_values.csv",
+                    filter_in_type=["float", "str", "bool"]),
+            partial(write_parameter, snapshot, [("commodity", "price")], "commodity,commodityParam,time,pt_commodity",
+                    "input/pt_commodity.csv", filter_in_type=["1d_map"], filter_out_index="period", param_print=True),
+            partial(write_parameter, snapshot, [("commodity", "price"), ("commodity", "co2_content")], "commodity,commodityParam,p_commodity",
+                    "input/p_commodity.csv", filter_in_type=["float", "str"], param_print=True),
+            partial(write_parameter, snapshot, [("commodity", "price")], "commodity,commodityParam,period,pd_commodity",
+                    "input/pd_commodity.csv", filter_in_type=["1d_map"], filter_out_index="time", param_print=True),
+            partial(write_entity, snapshot, ["commodity"], "commodity", "input/commodity.csv"),
+            partial(write_entity, snapshot, ["commodity__node"], "commodity,node", "input/commodity__node.csv"),
+            partial(write_parameter, snapshot, [("constraint", "sense")], "constraint,sense", "input/constraint__sense.csv"),
+            partial(write_parameter, snapshot, [("constraint", "constant")], "constraint,p_constraint_constant",
+                    "input/p_constraint_constant.csv"),
+            partial(write_parameter, snapshot, [("model", "debug")], "debug", "input/debug.csv"),
+            partial(write_entity, snapshot, ["node", "unit", "connection"], "entity", "input/entity.csv"),
+            partial(write_parameter, snapshot, [("node", "invest_method"), ("unit", "invest_method"), ("connection", "invest_method")],
+                    "entity,invest_method", "input/entity__invest_method.csv"),
+            partial(write_parameter, snapshot, [("node", "lifetime_method"), ("unit", "lifetime_method"),
+                                                ("connection", "lifetime_method")], "entity,lifetime_method",
+                    "input/entity__lifetime_method.csv"),
+            partial(write_entity, snapshot, ["group"], "group", "input/group.csv"),
+            partial(write_parameter, snapshot, [("group", "co2_method")], "group,co2_method", "input/group__co2_method.csv"),
+            partial(write_parameter, snapshot, [("group", "invest_method")], "group,invest_method", "input/group__invest_method.csv"),
+            partial(write_parameter, snapshot, [("group", "loss_share_type")], "group,loss_share_type",
+                    "input/group__loss_share_type.csv"),
+            partial(write_entity, snapshot, ["group__node"], "group,node", "input/group__node.csv"),
+            partial(write_entity, snapshot, ["group__unit", "group__connection"], "group,process", "input/group__process.csv"),
+            partial(write_entity, snapshot, ["group__unit__node", "group__connection__node"], "group,process,node",
+                    "input/group__process__node.csv"),
+            partial(write_parameter, snapshot, [("group", "has_capacity_margin")], "groupCapacityMargin",
+                    "input/groupCapacityMargin.csv", filter_in_value="yes", no_value=True),
+            partial(write_parameter, snapshot, [("group", "include_stochastics")], "group", "input/groupIncludeStochastics.csv",
+                    filter_in_value="yes", no_value=True),
+            partial(write_parameter, snapshot, [("group", "has_inertia")], "groupInertia", "input/groupInertia.csv",
+                    filter_in_value="yes", no_value=True),
+            partial(write_parameter, snapshot, [("group", "output_node_flows")], "groupOutputNodeFlows",
+                    "input/groupOutputNodeFlows.csv", filter_in_value="yes", no_value=True),
+            partial(write_parameter, snapshot, [("group", "output_aggregate_flows")], "groupOutputAggregateFlows",
+                    "input/groupOutputAggregateFlows.csv", filter_in_value="yes", no_value=True),
+            partial(write_parameter, snapshot, [("model", "exclude_entity_outputs")], "value", "input/exclude_entity_outputs.csv"),
+            partial(write_parameter, snapshot, [("model", "solves")], "model,solve", "input/model__solve.csv"),
+            partial(write_entity, snapshot, ["node"], "node", "input/node.csv"),
+            partial(write_parameter, snapshot, [("node", "constraint_capacity_coefficient")],
+                    "node,constraint,p_node_constraint_capacity_coefficient",
+                    "input/p_node_constraint_capacity_coefficient.csv"),
+            partial(write_parameter, snapshot, [("node", "constraint_state_coefficient")],
+                    "node,constraint,p_node_constraint_state_coefficient",
+                    "input/p_node_constraint_state_coefficient.csv"),
+            partial(write_parameter, snapshot, [("node", "has_balance")], "nodeBalance", "input/nodeBalance.csv",
+                    filter_in_value="yes", no_value=True),
+            partial(write_parameter, snapshot, [("node", "inflow_method")], "node,inflow_method", "input/node__inflow_method.csv"),
+            partial(write_parameter, snapshot, [("node", "node_type")], "node,node_type", "input/node__node_type.csv"),
+            partial(write_parameter, snapshot, [("node", "profile_method")], "node,profile,profile_method",
+                    "input/node__profile__profile_method.csv"),
+            partial(write_parameter, snapshot, [("node", "has_storage")], "nodeState", "input/nodeState.csv", filter_in_value="yes",
+                    no_value=True),
+            partial(write_parameter, snapshot, [("node", "storage_binding_method")], "node,storage_binding_method",
+                    "input/node__storage_binding_method.csv"),
+            partial(write_parameter, snapshot, [("node", "storage_nested_fix_method")], "node,storage_nested_fix_method",
+                    "input/node__storage_nested_fix_method.csv"),
+            partial(write_parameter, snapshot, [("node", "storage_solve_horizon_method")], "node,storage_solve_horizon_method",
+                    "input/node__storage_solve_horizon_method.csv"),
+            partial(write_parameter, snapshot, [("node", "storage_start_end_method")], "node,storage_start_end_method",
+                    "input/node__storage_start_end_method.csv"),
+            partial(write_parameter, snapshot, [("node", "penalty_down"), ("node", "self_discharge_loss"), ("node", "availability"),
+                                                ("node", "storage_state_reference_value")], "node,nodeParam,time,pt_node",
+                    "input/pt_node.csv", filter_in_type=["1d_map", "array", "time_series"],
+                    filter_out_index="period", param_print=True),
+            partial(write_parameter, snapshot, [("node", "penalty_down"), ("node", "self_discharge_loss"), ("node", "availability"),
+                                                ("node", "storage_state_reference_value")],
+                    "node,nodeParam,branch,time_start,time,pt_node", "input/pbt_node.csv",
+                    filter_in_type=["3d_map"], param_print=True),
+            partial(write_parameter, snapshot, [("node", "inflow")], "node,time,pt_node_inflow", "input/pt_node_inflow.csv",
+                    filter_in_type=["1d_map", "array", "time_series"], filter_out_index="period"),
+            partial(write_parameter, snapshot, [("node", "inflow")], "node,branch,time_start,time,pbt_node_inflow",
+                    "input/pbt_node_inflow.csv", filter_in_type=["3d_map"]),
+            partial(write_parameter, snapshot, [("node", "annual_flow"),
+                                                ("node", "peak_inflow"),
+                                                ("node", "invest_forced"),
+                                                ("node", "invest_max_period"),
+                                                ("node", "invest_min_period"),
+                                                ("node", "retire_forced"),
+                                                ("node", "retire_max_period"),
+                                                ("node", "retire_min_period"),
+                                                ("node", "invest_cost"),
+                                                ("node", "salvage_value"),
+                                                ("node", "interest_rate"),
+                                                ("node", "lifetime"),
+                                                ("node", "fixed_cost"),
+                                                ("node", "storage_state_reference_price"),
+                                                ("node", "availability"),
+                                                ("node", "penalty_up"),
+                                                ("node", "penalty_down"),
+                                                ("node", "cumulative_max_capacity"),
+                                                ("node", "cumulative_min_capacity"),
+                                                ("node", "self_discharge_loss"),
+                                                ("node", "existing"),
+                                                ("node", "storage_state_reference_value")], "node,nodeParam,period,pd_node",
+                    "input/pd_node.csv", filter_in_type=["1d_map"], filter_out_index="time", param_print=True),
+            partial(write_entity, snapshot, ["unit", "connection"], "process", "input/process.csv"),
+            partial(write_entity, snapshot, ["connection"], "process_connection", "input/process_connection.csv"),
+            partial(write_parameter, snapshot, [("unit__outputNode", "coefficient")], "process,sink,p_process_sink_coefficient",
+                    "input/p_process_sink_coefficient.csv", filter_in_type=["float", "str", "bool"]),
+            partial(write_parameter, snapshot, [("unit__inputNode", "coefficient")], "process,source,p_process_source_coefficient",
+                    "input/p_process_source_coefficient.csv", filter_in_type=["float", "str", "bool"]),
+            partial(write_parameter, snapshot, [("connection", "is_DC")], "process", "input/process_nonSync_connection.csv",
+                    filter_in_value="yes", no_value=True),
+            partial(write_entity, snapshot, ["unit"], "process_unit", "input/process_unit.csv"),
+            partial(write_parameter, snapshot, [("unit__outputNode", "other_operational_cost")], "process,sink,sourceSinkTimeParam,time,pt_process_sink",
+                    "input/pt_process_sink.csv", filter_in_type=["1d_map"], filter_out_index="period", param_print=True),
+            partial(write_parameter, snapshot, [("unit__outputNode", "other_operational_cost")], "process,sink,sourceSinkPeriodParam,period,pd_process_sink",
+                    "input/pd_process_sink.csv", filter_in_type=["1d_map"], filter_out_index="time", param_print=True),
+            partial(write_parameter, snapshot, [("unit__outputNode", "other_operational_cost")],
+                    "process,sink,sourceSinkTimeParam,branch,time_start,time,pbt_process_sink", "input/pbt_process_sink.csv",
+                    filter_in_type=["3d_map"], param_print=True),
+            partial(write_parameter, snapshot, [("unit__inputNode", "other_operational_cost")],
+                    "process,source,sourceSinkTimeParam,time,pt_process_source", "input/pt_process_source.csv",
+                    filter_in_type=["1d_map"], filter_out_index="period", param_print=True),
+            partial(write_parameter, snapshot, [("unit__inputNode", "other_operational_cost")],
+                    "process,source,sourceSinkPeriodParam,period,pd_process_source", "input/pd_process_source.csv",
+                    filter_in_type=["1d_map"], filter_out_index="time", param_print=True),
+            partial(write_parameter, snapshot, [("unit__inputNode", "other_operational_cost")],
+                    "process,source,sourceSinkTimeParam,branch,time_start,time,pbt_process_source", "input/pbt_process_source.csv",
+                    filter_in_type=["3d_map"], param_print=True),
+            partial(write_parameter, snapshot, [("connection__profile", "profile_method")], "process,profile,profile_method",
+                    "input/process__profile__profile_method.csv"),
+            partial(write_parameter, snapshot, [("unit__outputNode", "ramp_method"), ("unit__inputNode", "ramp_method")],
+                    "process,node,ramp_method", "input/process__node__ramp_method.csv"),
+            partial(write_parameter, snapshot, [("unit", "startup_method"), ("connection", "startup_method")],
+                    "process,startup_method", "input/process__startup_method.csv"),
+            partial(write_parameter, snapshot, [("unit", "conversion_method"), ("connection", "transfer_method")], "process,ct_method",
+                    "input/process__ct_method.csv"),
+            partial(write_entity, snapshot, ["reserve__upDown__unit__node", "reserve__upDown__connection__node"], "process,reserve,upDown,node",
+                       "input/process__reserve__upDown__node.csv", entity_dimens=[[2,0,1,3], [2,0,1,3]]),
+            partial(write_parameter, snapshot, [("profile", "profile")], "profile,time,pt_profile", "input/pt_profile.csv",
+                    filter_in_type=["1d_map"], filter_out_index="period"),
+            partial(write_parameter, snapshot, [("profile", "profile")], "profile,branch,time_start,time,pbt_profile", "input/pbt_profile.csv",
+                    filter_in_type=["3d_map"]),
+            partial(write_parameter, snapshot, [("profile", "profile")], "profile,period,pd_profile", "input/pd_profile.csv",
+                    filter_in_type=["1d_map"], filter_out_index="time"),
+            partial(write_parameter, snapshot, [("profile", "profile")], "profile,p_profile", "input/p_profile.csv",
+                    filter_in_type=["float", "str", "bool"]),
+            partial(write_entity, snapshot, ["profile"], "profile", "input/profile.csv"),
+            partial(write_parameter, snapshot, [("reserve__upDown__group", "increase_reserve_ratio"),
+                                                ("reserve__upDown__group", "penalty_reserve"),
+                                                ("reserve__upDown__group", "reservation")],
+                    "reserve,upDown,group,reserveParam,p_reserve_upDown_group",
+                    "input/p_reserve__upDown__group.csv", filter_in_type=["float", "str", "bool"], param_print=True),
+            partial(write_parameter, snapshot, [("reserve__upDown__group", "reservation")],
+                    "reserve,upDown,group,reserveParam,time,pt_reserve_upDown_group",
+                    "input/pt_reserve__upDown__group.csv", filter_in_type=["1d_map"], filter_out_index="period", param_print=True),
+            partial(write_parameter, snapshot, [("reserve__upDown__group", "reservation")],
+                    "reserve,upDown,group,reserveParam,branch,time_start,time,pbt_reserve_upDown_group",
+                    "input/pbt_reserve__upDown__group.csv", filter_in_type=["3d_map"], param_print=True),
+            partial(write_parameter, snapshot, [("reserve__upDown__group", "reserve_method")], "reserve,upDown,group,method",
+                    "input/reserve__upDown__group__method.csv"),
+            partial(write_parameter, snapshot, [("solve", "solver")], "solve,solver", "input/solver.csv"),
+            partial(write_parameter, snapshot, [("solve", "timeline_hole_multiplier")], "solve,p_hole_multiplier",
+                    "input/solve_hole_multiplier.csv"),
+            partial(write_parameter, snapshot, [("solve", "solver_precommand")], "solve,solver_precommand",
+                    "input/solver_precommand.csv"),
+            partial(write_parameter, snapshot, [("solve", "solver_arguments")], "solve,arguments", "input/solver_arguments.csv"),
+            partial(write_parameter, snapshot, [("solve", "highs_method"),
+                                                ("solve", "highs_parallel"),
+                                                ("solve", "highs_presolve"),
+                                                ("solve", "solve_mode")],
+                    "param,solve,value", "input/solve_mode.csv", param_print=True, param_loc = 0),
+            partial(write_parameter, snapshot, [("solve", "contains_solves")], "solve,include_solve",
+                    "input/solve__contains_solve.csv"),
+            partial(write_parameter, snapshot, [("solve", "realized_periods")], "solve,roll,period",
+                    "input/solve__realized_period_2d_map.csv", filter_in_type=["2d_map"], no_value=True),
+            partial(write_parameter, snapshot, [("solve", "fix_storage_periods")], "solve,roll,period",
+                    "input/solve__fix_storage_period_2d_map.csv", filter_in_type=["2d_map"], no_value=True),
+            partial(write_parameter, snapshot, [("solve", "invest_periods")], "solve,roll,period",
+                    "input/solve__invest_period_2d_map.csv", filter_in_type=["2d_map"], no_value=True),
+            partial(write_parameter, snapshot, [("solve", "realized_periods")], "solve,period", "input/solve__realized_period.csv",
+                    filter_in_type=["array", "1d_map"]),
+            partial(write_parameter, snapshot, [("solve", "realized_invest_periods")], "solve,invest_realized_period",
+                    "input/solve__realized_invest_period.csv", filter_in_type=["array", "1d_map"]),
+            partial(write_parameter, snapshot, [("solve", "realized_invest_periods")], "solve,roll,period",
+                    "input/solve__realized_invest_period_2d_map.csv", filter_in_type=["2d_map"], no_value=True),
+            partial(write_parameter, snapshot, [("solve", "fix_storage_periods")], "solve,period",
+                    "input/solve__fix_storage_period.csv", filter_in_type=["array", "1d_map"]),
+            partial(write_parameter, snapshot, [("solve", "invest_periods")], "solve,period", "input/solve__invest_period.csv",
+                    filter_in_type=["array", "1d_map"]),
+            partial(write_parameter, snapshot, [("solve", "years_represented")], "solve,period,years_represented",
+                    "input/solve__period__years_represented.csv"),
+            partial(write_parameter, snapshot, [("solve", "stochastic_branches")], "solve,period,branch,start_time,realized,weight",
+                    "input/stochastic_branches.csv"),
+            partial(write_parameter, snapshot, [("timeline", "timestep_duration")], "timeline,timestep,duration", "input/timeline.csv"),
+            partial(write_parameter, snapshot, [("timeline", "timeline_duration_in_years")], "timeline,p_timeline_duration_in_years",
+                    "input/timeline_duration_in_years.csv"),
+            partial(write_parameter, snapshot, [("timeblockSet", "block_duration")], "timeblocks,start,duration", "input/timeblocks.csv"),
+            partial(write_entity, snapshot, ["timeblockSet__timeline"], "timeblocks,timeline", "input/timeblocks__timeline.csv"),
+            partial(write_parameter, snapshot, [("solve", "period_timeblockSet")], "solve,roll,period,timeblocks",
+                    "input/timeblocks_in_use_2d.csv", filter_in_type=["2d_map"]),
+            partial(write_parameter, snapshot, [("solve", "period_timeblockSet")], "solve,period,timeblocks", "input/timeblocks_in_use.csv",
+                    filter_in_type=["1d_map"]),
+            partial(write_parameter, snapshot, [("timeblockSet", "new_stepduration")], "timeblockSet,step_duration",
+                    "input/timeblockSet__new_stepduration.csv", filter_out_index="time"),
+            partial(write_parameter, snapshot, [("unit__outputNode")], "process,sink,param", "input/unit__sinkNode__param.csv",
+                    filter_in_type=["1d_map"], filter_out_index="period", param_print=True),
+            partial(write_parameter, snapshot, [("unit__inputNode")], "process,source,param", "input/unit__sourceNode__param.csv",
+                    filter_out_index="period", param_print=True),
+            partial(write_parameter, snapshot, [("unit", "efficiency"),
+                                                ("unit", "efficiency_at_min_load"),
+                                                ("unit", "min_load"),
+                                                ("unit", "other_operational_cost"),
+                                                ("unit", "availability"),
+                                                ("connection", "efficiency"),
+                                                ("connection", "efficiency_at_min_load"),
+                                                ("connection", "min_load"),
+                                                ("connection", "other_operational_cost"),
+                                                ("connection", "availability"),
+                                               ],
+                    "process,processParam,time,pt_process", "input/pt_process.csv", filter_in_type=["1d_map"],
+                    filter_out_index="period", param_print=True),
+            partial(write_entity, snapshot, ["unit__inputNode", "connection__node__node"], "process,source", "input/process__source.csv",
+                    entity_dimens=[[0,1], [0,1]]),
+            partial(write_parameter, snapshot, [("unit__outputNode", "is_non_synchronous")], "process,sink",
+                    "input/process__sink_nonSync_unit.csv", filter_in_value="yes", no_value=True),
+            partial(write_entity, snapshot, ["unit__outputNode", "connection__node__node"], "process,sink", "input/process__sink.csv",
+                    entity_dimens=[[0,1], [0,2]]),
+            partial(write_parameter, snapshot, [("unit__node__profile", "profile_method")], "process,node,profile,profile_method",
+                    "input/process__node__profile__profile_method.csv"),
+            partial(write_parameter, snapshot, [("unit__inputNode")], "process,source,sourceSinkParam,p_process_source",
+                    "input/p_process_source.csv", param_print=True),
+            partial(write_parameter, snapshot, [("unit__outputNode")], "process,sink,sourceSinkParam,p_process_sink",
+                    "input/p_process_sink.csv", param_print=True),
+            partial(write_parameter, snapshot, [("reserve__upDown__unit__node", "increase_reserve_ratio"),
+                                                ("reserve__upDown__unit__node", "large_failure_ratio"),
+                                                ("reserve__upDown__unit__node", "max_share"),
+                                                ("reserve__upDown__unit__node", "reliability"),
+                                                ("reserve__upDown__connection__node", "increase_reserve_ratio"),
+                                                ("reserve__upDown__connection__node", "large_failure_ratio"),
+                                                ("reserve__upDown__connection__node", "max_share"),
+                                                ("reserve__upDown__connection__node", "reliability")
+                                                ],
+                    "process,reserve,upDown,node,reserveParam,p_process_reserve_upDown_node",
+                    "input/p_process__reserve__upDown__node.csv",
+                    filter_in_type=["float", "str", "bool"], param_print=True, dimens = [1, 2, 0, 3]),
+            partial(write_parameter, snapshot, [("unit__outputNode", "constraint_flow_coefficient"),
+                                                ("unit__inputNode", "constraint_flow_coefficient"),
+                                                ("connection__node", "constraint_flow_coefficient")],
+                    "process,node,constraint,p_process_node_constraint_flow_coefficient",
+                    "input/p_process_node_constraint_flow_coefficient.csv", filter_in_type=["1d_map"]),
+            partial(write_parameter, snapshot, [("unit", "constraint_capacity_coefficient"),
+                                                ("connection", "constraint_capacity_coefficient")],
+                    "process,constraint,p_process_constraint_capacity_coefficient",
+                    "input/p_process_constraint_capacity_coefficient.csv", filter_in_type=["1d_map"]),
+            partial(write_parameter, snapshot, [("unit", "availability"),
+                                                ("unit", "cumulative_max_capacity"),
+                                                ("unit", "cumulative_min_capacity"),
+                                                ("unit", "efficiency"),
+                                                ("unit", "efficiency_at_min_load"),
+                                                ("unit", "existing"),
+                                                ("unit", "fixed_cost"),
+                                                ("unit", "interest_rate"),
+                                                ("unit", "invest_cost"),
+                                                ("unit", "invest_max_total"),
+                                                ("unit", "invest_min_total"),
+                                                ("unit", "lifetime"),
+                                                ("unit", "min_downtime"),
+                                                ("unit", "min_load"),
+                                                ("unit", "min_uptime"),
+                                                ("unit", "retire_max_total"),
+                                                ("unit", "retire_min_total"),
+                                                ("unit", "salvage_value"),
+                                                ("unit", "startup_cost"),
+                                                ("unit", "virtual_unitsize"),
+                                                ("connection", "availability"),
+                                                ("connection", "cumulative_max_capacity"),
+                                                ("connection", "cumulative_min_capacity"),
+                                                ("connection", "efficiency"),
+                                                ("connection", "existing"),
+                                                ("connection", "fixed_cost"),
+                                                ("connection", "interest_rate"),
+                                                ("connection", "invest_cost"),
+                                                ("connection", "invest_max_total"),
+                                                ("connection", "invest_min_total"),
+                                                ("connection", "lifetime"),
+                                                ("connection", "other_operational_cost"),
+                                                ("connection", "retire_max_total"),
+                                                ("connection", "retire_min_total"),
+                                                ("connection", "salvage_value"),
+                                                ("connection", "startup_cost"),
+                                                ("connection", "virtual_unitsize")
+                                               ],
+                    "process,processParam,p_process", "input/p_process.csv",
+                    filter_in_type=["float", "str", "bool"], param_print=True),
+            partial(write_parameter, snapshot, [("node", "annual_flow"),
+                                                ("node", "availability"),
+                                                ("node", "cumulative_max_capacity"),
+                                                ("node", "cumulative_min_capacity"),
+                                                ("node", "existing"),
+                                                ("node", "fixed_cost"),
+                                                ("node", "inflow"),
+                                                ("node", "interest_rate"),
+                                                ("node", "invest_cost"),
+                                                ("node", "invest_forced"),
+                                                ("node", "invest_max_total"),
+                                                ("node", "invest_min_total"),
+                                                ("node", "lifetime"),
+                                                ("node", "peak_inflow"),
+                                                ("node", "penalty_down"),
+                                                ("node", "penalty_up"),
+                                                ("node", "retire_max_total"),
+                                                ("node", "retire_min_total"),
+                                                ("node", "salvage_value"),
+                                                ("node", "self_discharge_loss"),
+                                                ("node", "storage_state_end"),
+                                                ("node", "storage_state_reference_price"),
+                                                ("node", "storage_state_reference_value"),
+                                                ("node", "storage_state_start"),
+                                                ("node", "storate_state_end"),
+                                                ("node", "virtual_unitsize")
+                                               ], "node,nodeParam,p_node", "input/p_node.csv",
+                    filter_in_type=["float", "str", "bool"], param_print=True),
+            partial(write_parameter, snapshot, [("group__unit", "groupParam"), ("group__connection", "groupParam")],
+                    "group,process,groupParam,p_group_process_s",
+                    "input/p_group__process.csv", param_print=True),
+            partial(write_parameter, snapshot, [("group", "groupParam"),
+                                                ("group", "capacity_margin"),
+                                                ("group", "co2_max_total"),
+                                                ("group", "co2_price"),
+                                                ("group", "inertia_limit"),
+                                                ("group", "invest_max_total"),
+                                                ("group", "invest_min_total"),
+                                                ("group", "max_cumulative_flow"),
+                                                ("group", "max_instant_flow"),
+                                                ("group", "min_cumulative_flow"),
+                                                ("group", "min_instant_flow"),
+                                                ("group", "non_synchronous_limit"),
+                                                ("group", "penalty_capacity_margin"),
+                                                ("group", "penalty_inertia"),
+                                                ("group", "penalty_non_synchronous"),
+                                               ], "group,groupParam,p_group", "input/p_group.csv",
+                    filter_in_type=["float", "str", "bool"], param_print=True),
+            partial(write_parameter, snapshot, [("unit", "invest_forced"),
+                                                ("unit", "invest_max_period"),
+                                                ("unit", "invest_min_period"),
+                                                ("unit", "retire_forced"),
+                                                ("unit", "retire_max_period"),
+                                                ("unit", "retire_min_period"),
+                                                ("unit", "invest_cost"),
+                                                ("unit", "salvage_value"),
+                                                ("unit", "interest_rate"),
+                                                ("unit", "lifetime"),
+                                                ("unit", "fixed_cost"),
+                                                ("unit", "other_operational_cost"),
+                                                ("unit", "existing"),
+                                                ("unit", "cumulative_max_capacity"),
+                                                ("unit", "cumulative_min_capacity"),
+                                                ("connection", "invest_forced"),
+                                                ("connection", "invest_max_period"),
+                                                ("connection", "invest_min_period"),
+                                                ("connection", "retire_forced"),
+                                                ("connection", "retire_max_period"),
+                                                ("connection", "retire_min_period"),
+                                                ("connection", "invest_cost"),
+                                                ("connection", "salvage_value"),
+                                                ("connection", "interest_rate"),
+                                                ("connection", "lifetime"),
+                                                ("connection", "fixed_cost"),
+                                                ("connection", "other_operational_cost"),
+                                                ("connection", "existing"),
+                                                ("connection", "cumulative_max_capacity"),
+                                                ("connection", "cumulative_min_capacity"),
+                                               ],
+                    "process,processParam,period,pd_process", "input/pd_process.csv", filter_in_type=["1d_map"],
+                    filter_out_index="time", param_print=True),
+            partial(write_parameter, snapshot, [("model", "discount_rate")], "model,p_discount_rate", "input/p_discount_rate.csv"),
+            partial(write_parameter, snapshot, [("model", "discount_offset_operations")], "model,p_discount_offset_operations",
+                    "input/p_discount_offset_operations.csv"),
+            partial(write_parameter, snapshot, [("model", "discount_offset_investment")], "model,p_discount_offset_investment",
+                    "input/p_discount_offset_investment.csv"),
+            partial(write_parameter, snapshot, [("group", "co2_max_period"),
+                                                ("group", "co2_price"),
+                                                ("group", "inertia_limit"),
+                                                ("group", "invest_max_period"),
+                                                ("group", "invest_min_period"),
+                                                ("group", "invest_min_total"),
+                                                ("group", "max_cumulative_flow"),
+                                                ("group", "max_instant_flow"),
+                                                ("group", "min_cumulative_flow"),
+                                                ("group", "min_instant_flow"),
+                                                ("group", "non_synchronous_limit"),
+                                                ("group", "penalty_capacity_margin"),
+                                                ("group", "penalty_inertia"),
+                                                ("group", "penalty_non_synchronous"),
+                                                ], "group,groupParam,period,pd_group", "input/pd_group.csv",
+                    filter_in_type=["1d_map"], filter_out_index="time", param_print=True),
+            partial(write_parameter, snapshot, [("group", "co2_price"),
+                                                ("group", "max_instant_flow"),
+                                                ("group", "min_instant_flow"),
+                                               ], "group,groupParam,period,pt_group", "input/pt_group.csv",
+                    filter_in_type=["1d_map"], filter_out_index="period", param_print=True),
+            partial(write_parameter, snapshot, [("unit", "efficiency"),
+                                                ("unit", "efficiency_at_min_load"),
+                                                ("unit", "min_load"),
+                                                ("unit", "other_operational_cost"),
+                                                ("unit", "availability"),
+                                                ("connection", "efficiency"),
+                                                ("connection", "efficiency_at_min_load"),
+                                                ("connection", "min_load"),
+                                                ("connection", "other_operational_cost"),
+                                                ("connection", "availability")
+                                               ],
+                    "process,processParam,branch,time_start,time,pbt_process", "input/pbt_process.csv",
+                    filter_in_type=["3d_map"], param_print=True),
+            partial(write_parameter, snapshot, [("model", "exclude_entity_outputs"),
+                                                ("model", "output_connection__node__node_flow_t"),
+                                                ("model", "output_connection_flow_separate"),
+                                                ("model", "output_horizon"),
+                                                ("model", "output_ramp_envelope"),
+                                                ("model", "output_unit__node_flow_t"),
+                                                ("model", "output_unit__node_ramp_t"),
+                                               ], "output,value", "input/optional_outputs.csv", param_print=True, no_entity=True),
+            partial(write_parameter, snapshot, [("group", "output_results")], "groupOutput", "input/groupOutput.csv",
+                    filter_in_value="yes", no_value=True),
+            partial(write_parameter, snapshot, [("group", "has_non_synchronous")], "groupNonSync", "input/groupNonSync.csv",
+                    filter_in_value="yes", no_value=True),
+            partial(write_default_values, snapshot, [("model", "version")], "version", "input/db_version.csv",
+                    filter_in_type=["float", "str", "bool"], only_value=True),
+        ]
+        # the fingerprints have to be taken before the jobs run, write_parameter modifies its filter_in_type argument
+        manifest_file = "input_manifest.json"
+        fingerprints = {job.args[3]: snapshot.fingerprint(job) for job in jobs}
+        # the writers of this module define the format of the files, files written by another version are rewritten
+        with open(__file__, 'rb') as source_file:
+            input_format = hashlib.sha256(source_file.read()).hexdigest()
+        manifest = {}
+        if incremental and os.path.exists(manifest_file):
+            with open(manifest_file, 'r') as manifest_handle:
+                saved_manifest = json.load(manifest_handle)
+            if saved_manifest.get("format") == input_format:
+                manifest = saved_manifest.get("files", {})
+        jobs = [job for job in jobs
+                if manifest.get(job.args[3]) != fingerprints[job.args[3]] or not os.path.exists(job.args[3])]
+        self.logger.info(f"Writing {len(jobs)} input files, {len(fingerprints) - len(jobs)} are unchanged")
+        # an interrupted export must not leave fingerprints of files that were only partly written
+        if os.path.exists(manifest_file):
+            os.remove(manifest_file)
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(job) for job in jobs]
+                for future in futures:
+                    future.result()
+        else:
+            for job in jobs:
+                job()
+        with open(manifest_file, 'w') as manifest_handle:
+            json.dump({"format": input_format, "files": fingerprints}, manifest_handle, indent=0)
+        self.record_time("write_input", start)
+
 
+class Timeline:
+    """
+    Timesteps of a timeline with their durations and hours from the start of the timeline in arrays,
+    and the position of each timestep by its name.
+    """
+
+    def __init__(self, steps):
+        self.names = [step[0] for step in steps]
+        self.durations = np.array([float(step[1]) for step in steps])
+        self.hours_from_start = np.zeros(len(self.durations))
+        self.hours_from_start[1:] = np.cumsum(self.durations)[:-1]
+        self.index = {}
+        for i, name in enumerate(self.names):
+            self.index.setdefault(name, i)
+
+    def __len__(self):
+        return len(self.names)
+
+    def hour_from_start(self, name):
+        return self.hours_from_start[self.index[name]]
+
+
+class SolveData:
+    """
+    Contents of the files written for each roll (solve_data/ and input/p_model.csv).
+    The files are first written to memory with open() and then to disk with write(),
+    which skips the files that have the same content as when they were last written.
+    Files that the model itself writes, like the storage fixes, must not be written through SolveData.
+    """
+
+    def __init__(self):
+        self.pending = dict()
+        self.written = dict()
+
+    def open(self, filename, newline=None):
+        return SolveDataFile(self, filename, newline)
+
+    def write(self):
+        """
+        write the files that changed since they were last written
+        :return: number of files written
+        """
+        files_written = 0
+        for filename, (content, newline) in self.pending.items():
+            if self.written.get(filename) != content:
+                with open(filename, 'w', newline=newline) as outfile:
+                    outfile.write(content)
+                self.written[filename] = content
+                files_written += 1
+        self.pending.clear()
+        return files_written
+
+
+class SolveDataFile(io.StringIO):
+    """
+    In-memory file of SolveData, handed to SolveData when closed
+    """
+
+    def __init__(self, solve_data, filename, newline):
+        super().__init__()
+        self.solve_data = solve_data
+        self.filename = filename
+        self.newline = newline
+
+    def close(self):
+        if not self.closed:
+            self.solve_data.pending[self.filename] = (self.getvalue(), self.newline)
+        super().close()
+
+
+class InputSnapshot:
+    """
+    In-memory copy of the scenario filtered input database.
+    Offers the queries of DatabaseMapping that the input writers use, so that the database is read once
+    and the input files can be written concurrently without sharing the database connection between threads.
+    """
+
+    def __init__(self, db, value_cache=None):
+        self.entities = defaultdict(list)
+        self.parameter_values = defaultdict(list)
+        self.parameter_definitions = dict()
+        for entity in db.get_entity_items():
+            self.entities[entity["entity_class_name"]].append({"name": entity["name"],
+                                                               "entity_byname": entity["entity_byname"]})
+        for param in db.get_parameter_value_items():
+            self.parameter_values[(param["entity_class_name"], param["parameter_definition_name"])].append(
+                {"entity_class_name": param["entity_class_name"],
+                 "entity_name": param["entity_name"],
+                 "entity_byname": param["entity_byname"],
+                 "parameter_definition_name": param["parameter_definition_name"],
+                 "alternative_name": param["alternative_name"],
+                 "type": param["type"],
+                 "value": param["value"],
+                 "parsed_value": value_cache.parsed_value(param) if value_cache else param["parsed_value"]})
+        for definition in db.get_parameter_definition_items():
+            self.parameter_definitions[(definition["entity_class_name"], definition["name"])] = \
+                {"entity_class_name": definition["entity_class_name"],
+                 "name": definition["name"],
+                 "default_type": definition["default_type"],
+                 "default_value": definition["default_value"]}
+
+    def get_entity_items(self, entity_class_name):
+        return self.entities.get(entity_class_name, [])
+
+    def get_parameter_value_items(self, entity_class_name, parameter_definition_name):
+        return self.parameter_values.get((entity_class_name, parameter_definition_name), [])
+
+    def get_parameter_definition_item(self, entity_class_name, name):
+        return self.parameter_definitions.get((entity_class_name, name), {})
+
+    def fingerprint(self, job):
+        """
+        content hash of an input file job: the writer, its arguments and the snapshot data the writer reads
+        :param job: partial of write_parameter, write_entity or write_default_values with the snapshot as first argument
+        :return: hex digest
+        """
+        digest = hashlib.sha256()
+        digest.update(repr((job.func.__name__, job.args[1:], sorted(job.keywords.items()))).encode())
+        for cl_par in job.args[1]:
+            if job.func is write_entity:
+                for entity in self.get_entity_items(cl_par):
+                    digest.update(repr(entity["entity_byname"]).encode())
+            elif job.func is write_default_values:
+                definition = self.get_parameter_definition_item(cl_par[0], cl_par[1])
+                digest.update(repr((definition.get("default_type"), definition.get("default_value"))).encode())
+            else:
+                for param in self.get_parameter_value_items(cl_par[0], cl_par[1]):
+                    digest.update(repr((param["entity_byname"], param["parameter_definition_name"], param["type"])).encode())
+                    digest.update(param["value"])
+        return digest.hexdigest()
+
+
+
+class DecodedValueCache:
+    """
+    Parameter values decoded with api.from_database, kept for one database revision and scenario.
+    The cache is stored in the cache folder between runs and discarded when the database gets a new commit
+    or when the cache format or the spinedb_api version changes.
+    """
+    cache_format = 1
+
+    def __init__(self, db, input_db_url, scenario_name, cache_dir="cache"):
+        self.revision = self.revision_key(db, input_db_url, scenario_name)
+        name = hashlib.sha256(repr((input_db_url, scenario_name)).encode()).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, "decoded_values_" + name + ".pickle")
+        self.values = dict()
+        self.changed = False
+        self.lock = threading.Lock()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'rb') as cache_file:
+                    cached = pickle.load(cache_file)
+                if cached["revision"] == self.revision:
+                    self.values = cached["values"]
+            except Exception:
+                # unpickling can fail in many ways, e.g. when a class of spinedb_api has been moved or removed
+                self.values = dict()
+                logging.warning("Could not read the decoded value cache " + self.path + ", decoding all values")
+
+    @staticmethod
+    def revision_key(db, input_db_url, scenario_name):
+        """
+        identify the database revision by its url, the scenario and the latest commit,
+        and the format of the decoded values by the cache format and the spinedb_api version
+        """
+        commits = db.get_items("commit")
+        if commits:
+            last_commit = max(commits, key=lambda commit: commit["date"])
+            commit_id = (getattr(last_commit["id"], "db_id", last_commit["id"]), str(last_commit["date"]))
+        else:
+            commit_id = None
+        return repr((input_db_url, scenario_name, commit_id, DecodedValueCache.cache_format, api.__version__))
+
+    def parsed_value(self, param):
+        """
+        return the decoded value of a parameter value item, decoding it only if it is not in the cache
+        """
+        key = (param["entity_class_name"], tuple(param["entity_byname"]),
+               param["parameter_definition_name"], param["alternative_name"])
+        value = self.values.get(key)
+        if value is None:
+            value = api.from_database(param["value"], param["type"])
+            with self.lock:
+                self.values[key] = value
+                self.changed = True
+        return value
+
+    def save(self):
+        if not self.changed:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # write to a temporary file first, the cache can be shared by concurrent runs
+        temporary_path = self.path + "." + str(os.getpid())
+        with open(temporary_path, 'wb') as cache_file:
+            pickle.dump({"revision": self.revision, "values": self.values}, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, self.path)
+        self.changed = False
+
+
+def link_file(source, destination):
+    """
+    hard link source to destination (replacing it), copy the file if the filesystem does not allow the link
+    """
+    if os.path.lexists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy(source, destination)
 
 
 def write_entity(db, cl, header, filename, entity_dimens=None):
@@ -2392,83 +3033,82 @@ def write_parameter(db, cl_pars, header, filename,
     for cl_par in cl_pars:
         params = params + db.get_parameter_value_items(entity_class_name=cl_par[0],
                                                        parameter_definition_name=cl_par[1])
-    with open(filename, 'w') as realfile:
-        realfile.write(header + "\n")
-        for param in params:
-            # This filter ensures that the parameter is of required type (skip to next if not)
-            if filter_in_type and param["type"] not in filter_in_type:
-                continue
-
-            entity_byname = param["entity_byname"]
-            if dimens:
-                temp_entity_byname = [None] * len(entity_byname)
-                for i, dimen in enumerate(dimens):
-                    temp_entity_byname[dimen] = entity_byname[i]
-                entity_byname = temp_entity_byname
-
-
-            if param_print:
-                if param_loc is not None:
-                    time.sleep(0.1)
-                    collect = []
-                    for (i, byname) in enumerate(entity_byname):
-                        if i == param_loc:
-                            collect.append(param["parameter_definition_name"])
-                        collect.append(byname)
-                    first_cols = ','.join(collect)
+    rows = []
+    for param in params:
+        # This filter ensures that the parameter is of required type (skip to next if not)
+        if filter_in_type and param["type"] not in filter_in_type:
+            continue
+
+        entity_byname = param["entity_byname"]
+        if dimens:
+            temp_entity_byname = [None] * len(entity_byname)
+            for i, dimen in enumerate(dimens):
+                temp_entity_byname[dimen] = entity_byname[i]
+            entity_byname = temp_entity_byname
+
+        if param_print:
+            if param_loc is not None:
+                first_cols = []
+                for (i, byname) in enumerate(entity_byname):
+                    if i == param_loc:
+                        first_cols.append(param["parameter_definition_name"])
+                    first_cols.append(byname)
+            else:
+                if no_entity:
+                    first_cols = [param["parameter_definition_name"]]
                 else:
-                    if no_entity:
-                        first_cols = param["parameter_definition_name"]
+                    first_cols = list(entity_byname) + [param["parameter_definition_name"]]
+        else:
+            first_cols = list(entity_byname)
+        if param["type"] == "map":
+            # If the first parameter index contains filter_out_index, then skip the parameter (maybe should be extended to other indexes)
+            if filter_out_index and param["parsed_value"].index_name == filter_out_index:
+                continue
+            # Check that map dimensionality matches with filter requirement (if not, then skip)
+            dimension_count = api.parameter_value.from_database_to_dimension_count(param["value"], param["type"])
+            if filter_in_type and type_filter_map_dim != dimension_count:
+                continue
+            value = param["parsed_value"]
+            if dimension_count <= 1:
+                # Doing a zip, since there can be multiple rows in the map
+                for index, val in zip(value.indexes, value.values):
+                    if no_value:
+                        rows.append(first_cols + [index])
                     else:
-                        first_cols = ','.join(entity_byname) + ',' + param["parameter_definition_name"]
+                        rows.append(first_cols + [index, str(val)])
             else:
-                first_cols = ','.join(entity_byname)
-            if param["type"] == "map":
-                # If the first parameter index contains filter_out_index, then skip the parameter (maybe should be extended to other indexes)
-                if filter_out_index and param["parsed_value"].index_name == filter_out_index:
-                    continue
-                # Check that map dimensionality matches with filter requirement (if not, then skip)
-                if filter_in_type and type_filter_map_dim != api.parameter_value.from_database_to_dimension_count(param["value"], param["type"]):
-                    continue
-                value = param["parsed_value"]
-                indexes = []
-                if api.parameter_value.from_database_to_dimension_count(param["value"], param["type"]) <= 1:
-                    result = list(value.indexes)
-                    # Doing a zip, since there can be multiple rows in the map
-                    result = list(zip(result, [str(v) for v in value.values]))
-                    for res in result:
-                        if no_value:
-                            realfile.write(first_cols + ',' + res[0] + '\n')
-                        else:
-                            realfile.write(first_cols + ',' + ','.join(res) + '\n')
-                else:
-                    flat_map = api.convert_map_to_table(value)
-                    for (i, index) in enumerate(flat_map):
-                        if no_value:
-                            realfile.write(first_cols + ',' + ','.join(index[:-1]) + '\n')
-                        else:
-                            index[-1] = str(index[-1])
-                            realfile.write(first_cols + ',' + ','.join(index) + '\n')
-            elif param["type"] == "array" or param["type"] == "time_series":
-                for row in param["parsed_value"].values:
-                    realfile.write(','.join(entity_byname) + ',' + row + '\n')
-            elif param["type"] == "str" or param["type"] == "float" or param["type"] == "bool":
-                # Filter based on values: only if the value is found, then data is written
-                if filter_in_value and param["parsed_value"] != filter_in_value:
-                    continue
-                if no_value:
-                    realfile.write(first_cols + '\n')
-                else:
-                    realfile.write(first_cols + ',' + str(param["parsed_value"]) + '\n')
+                flat_map = api.convert_map_to_table(value)
+                for index in flat_map:
+                    if no_value:
+                        rows.append(first_cols + index[:-1])
+                    else:
+                        index[-1] = str(index[-1])
+                        rows.append(first_cols + index)
+        elif param["type"] == "array" or param["type"] == "time_series":
+            for row in param["parsed_value"].values:
+                rows.append(list(entity_byname) + [row])
+        elif param["type"] == "str" or param["type"] == "float" or param["type"] == "bool":
+            # Filter based on values: only if the value is found, then data is written
+            if filter_in_value and param["parsed_value"] != filter_in_value:
+                continue
+            if no_value:
+                rows.append(first_cols)
             else:
-                if not filter_in_type:
-                    filter_in_type = ["bool", "str", "float", "array", "time_series", "map"]
-                logging.error(f"Input data found in a parameter not of supported type."+ 
-                              f"\nEntity: {','.join(entity_byname)}"+
-                              f"\nParameter: {param['parameter_definition_name']}"+
-                              f"\nSupported types: {filter_in_type}"+
-                              f"\nParameter type: {param['type']}")
-                sys.exit(-1)
+                rows.append(first_cols + [str(param["parsed_value"])])
+        else:
+            if not filter_in_type:
+                filter_in_type = ["bool", "str", "float", "array", "time_series", "map"]
+            logging.error(f"Input data found in a parameter not of supported type."+ 
+                          f"\nEntity: {','.join(entity_byname)}"+
+                          f"\nParameter: {param['parameter_definition_name']}"+
+                          f"\nSupported types: {filter_in_type}"+
+                          f"\nParameter type: {param['type']}")
+            sys.exit(-1)
+
+    with open(filename, 'w') as realfile:
+        realfile.write(header + "\n")
+        writer = csv.writer(realfile, delimiter=',', lineterminator='\n')
+        writer.writerows(rows)
 
 
 def flatten_map(mapList, indexes):
@@ -2514,6 +3154,366 @@ def write_default_values(db, cl_pars, header, filename, filter_in_type=None, onl
                 sys.exit(-1)
 
 
+def glpk_to_highs_lp(prob):
+    """
+    copy the LP/MIP of a GLPK problem object to a highspy HighsLp, keeping the order of the rows and columns.
+    GLPK keeps the objective also as a free row, it is left out and its position is returned,
+    so that highs can put the objective back to the same place in the glpsol style solution file
+    :return: HighsLp, position of the objective row (0 if there is none)
+    """
+    inf = highspy.kHighsInf
+    def bounds(bound_type, lower, upper):
+        return (lower if bound_type in (glpk.GLP_LO, glpk.GLP_DB, glpk.GLP_FX) else -inf,
+                upper if bound_type in (glpk.GLP_UP, glpk.GLP_DB, glpk.GLP_FX) else inf)
+
+    num_cols = glpk.glp_get_num_cols(prob)
+    objective_name = glpk.glp_get_obj_name(prob)
+    cost_row = 0
+    rows = []
+    for i in range(1, glpk.glp_get_num_rows(prob) + 1):
+        if not cost_row and glpk.glp_get_row_type(prob, i) == glpk.GLP_FR and glpk.glp_get_row_name(prob, i) == objective_name:
+            cost_row = i
+        else:
+            rows.append(i)
+    # position of each GLPK row in the highs model
+    row_position = np.full(glpk.glp_get_num_rows(prob) + 1, -1, dtype=np.int32)
+    row_position[rows] = np.arange(len(rows), dtype=np.int32)
+
+    lp = highspy.HighsLp()
+    lp.num_row_ = len(rows)
+    lp.num_col_ = num_cols
+    row_bounds = [bounds(glpk.glp_get_row_type(prob, i), glpk.glp_get_row_lb(prob, i), glpk.glp_get_row_ub(prob, i))
+                  for i in rows]
+    col_bounds = [bounds(glpk.glp_get_col_type(prob, j), glpk.glp_get_col_lb(prob, j), glpk.glp_get_col_ub(prob, j))
+                  for j in range(1, num_cols + 1)]
+    lp.row_lower_ = np.array([bound[0] for bound in row_bounds])
+    lp.row_upper_ = np.array([bound[1] for bound in row_bounds])
+    lp.col_lower_ = np.array([bound[0] for bound in col_bounds])
+    lp.col_upper_ = np.array([bound[1] for bound in col_bounds])
+    lp.col_cost_ = np.array([glpk.glp_get_obj_coef(prob, j) for j in range(1, num_cols + 1)])
+    # the constant of the objective is left out like in the objective row of GLPK, the model adds it when reading the results
+    lp.offset_ = 0.0
+    lp.sense_ = highspy.ObjSense.kMaximize if glpk.glp_get_obj_dir(prob) == glpk.GLP_MAX else highspy.ObjSense.kMinimize
+    # the constraint matrix column by column, without the objective row
+    starts = [0]
+    indices = []
+    values = []
+    index_array = glpk.intArray(glpk.glp_get_num_rows(prob) + 1)
+    value_array = glpk.doubleArray(glpk.glp_get_num_rows(prob) + 1)
+    for j in range(1, num_cols + 1):
+        length = glpk.glp_get_mat_col(prob, j, index_array, value_array)
+        for k in range(1, length + 1):
+            position = row_position[index_array[k]]
+            if position >= 0:
+                indices.append(position)
+                values.append(value_array[k])
+        starts.append(len(indices))
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.num_row_ = len(rows)
+    lp.a_matrix_.num_col_ = num_cols
+    lp.a_matrix_.start_ = np.array(starts, dtype=np.int32)
+    lp.a_matrix_.index_ = np.array(indices, dtype=np.int32)
+    lp.a_matrix_.value_ = np.array(values)
+    if glpk.glp_get_num_int(prob) > 0:
+        lp.integrality_ = [highspy.HighsVarType.kInteger if glpk.glp_get_col_kind(prob, j) != glpk.GLP_CV
+                           else highspy.HighsVarType.kContinuous for j in range(1, num_cols + 1)]
+    return lp, cost_row
+
+
+def sample_rss(pid, samples, done, interval=0.1):
+    """
+    append the resident memory (bytes) of a process to samples every interval seconds
+    until done is set or the process has ended
+    """
+    try:
+        process = psutil.Process(pid)
+        while True:
+            samples.append(process.memory_info().rss)
+            if done.wait(interval):
+                break
+    except psutil.Error:
+        pass
+
+
+def mps_header(mps_file):
+    """
+    read the header comments glpsol writes at the start of an MPS file (* Columns:    96, * Class:      LP ...),
+    so that the whole file does not need to be read. Files ending with .gz are read as gzip.
+    :return: dict of the header fields, e.g. {"Rows": "49", "Columns": "96", "Class": "LP"}
+    """
+    header = {}
+    opener = gzip.open if mps_file.endswith(".gz") else open
+    with opener(mps_file, 'rt') as mps_file_handle:
+        for line in mps_file_handle:
+            if not line.startswith("*"):
+                break
+            key, separator, value = line[1:].partition(":")
+            if separator:
+                header[key.strip()] = value.strip()
+    return header
+
+
+def read_solution_header(solution_file):
+    """
+    status and objective from the start of a GLPK raw solution file (written by glpsol -w or by highs in the glpsol style):
+    c Status:     OPTIMAL
+    ...
+    s bas 49 96 f f 47801.6775
+    :return: dict with status and objective
+    """
+    header = {"status": None, "objective": None}
+    with open(solution_file, 'r') as solution:
+        for line in solution:
+            if line.startswith("c Status:"):
+                header["status"] = line.partition(":")[2].strip()
+            elif line.startswith("s "):
+                header["objective"] = float(line.split()[-1])
+                break
+            elif not line.startswith("c"):
+                break
+    return header
+
+
+# summary lines at the end of the highs output, the iterations of the LP solvers used are summed
+highs_report = [
+    (re.compile(r'^Model\s+status\s*:\s*(.+)$'), "status", str),
+    (re.compile(r'^Objective value\s*:\s*(\S+)'), "objective", float),
+    (re.compile(r'^(?:Simplex|IPM|Crossover)\s+iterations\s*:\s*(\d+)'), "iterations", int),
+    (re.compile(r'^LP iterations\s+(\d+)'), "iterations", int),
+    (re.compile(r'^Nodes\s+(\d+)'), "nodes", int),
+    (re.compile(r'^Gap\s+(\S+)%'), "mip_gap", lambda value: float(value) / 100),
+]
+# simplex iterations of glpsol ("*   587: obj = ...") and branch and bound progress
+# ("+   436: mip = ... 1.1% (12; 30)", with the numbers of active and fathomed subproblems)
+glpsol_iteration = re.compile(r'^[*+~ ]\s*(\d+):\s')
+glpsol_branch = re.compile(r'\s(\S+)%\s+\((\d+);\s*(\d+)\)$')
+
+
+def parse_highs_output(line, result):
+    """
+    update the solve result record from a line of the highs output
+    """
+    line = line.strip()
+    for index, (pattern, key, convert) in enumerate(highs_report):
+        match = pattern.match(line)
+        if match:
+            try:
+                value = convert(match.group(1))
+            except ValueError:
+                return
+            if index == 2 and result[key] is not None:
+                value += result[key]
+            result[key] = value
+            return
+
+
+def parse_glpsol_output(line, result):
+    """
+    update the solve result record from a line of the glpsol output: the iteration count of the latest simplex
+    or branch and bound progress line, the relative MIP gap and the number of subproblems
+    """
+    match = glpsol_iteration.match(line)
+    if match:
+        result["iterations"] = int(match.group(1))
+        if line.startswith("+"):
+            branch = glpsol_branch.search(line.rstrip())
+            if branch:
+                result["nodes"] = int(branch.group(2)) + int(branch.group(3))
+                try:
+                    result["mip_gap"] = float(branch.group(1)) / 100
+                except ValueError:
+                    pass
+
+
+def same_lp_structure(previous, lp):
+    """
+    check if two HighsLp have the same dimensions, objective sense, integrality and constraint matrix,
+    so that one can be turned into the other by changing costs and bounds
+    """
+    return (previous.num_col_ == lp.num_col_ and previous.num_row_ == lp.num_row_ and previous.sense_ == lp.sense_
+            and list(previous.integrality_) == list(lp.integrality_)
+            and np.array_equal(previous.a_matrix_.start_, lp.a_matrix_.start_)
+            and np.array_equal(previous.a_matrix_.index_, lp.a_matrix_.index_)
+            and np.array_equal(previous.a_matrix_.value_, lp.a_matrix_.value_))
+
+
+def update_highs_lp(highs, previous, lp):
+    """
+    change the costs, column bounds and row bounds of the model in highs from previous to lp where they differ
+    """
+    changed = np.flatnonzero(np.asarray(previous.col_cost_) != np.asarray(lp.col_cost_)).astype(np.int32)
+    if len(changed):
+        highs.changeColsCost(len(changed), changed, np.asarray(lp.col_cost_)[changed])
+    changed = np.flatnonzero((np.asarray(previous.col_lower_) != np.asarray(lp.col_lower_))
+                             | (np.asarray(previous.col_upper_) != np.asarray(lp.col_upper_))).astype(np.int32)
+    if len(changed):
+        highs.changeColsBounds(len(changed), changed, np.asarray(lp.col_lower_)[changed], np.asarray(lp.col_upper_)[changed])
+    changed = np.flatnonzero((np.asarray(previous.row_lower_) != np.asarray(lp.row_lower_))
+                             | (np.asarray(previous.row_upper_) != np.asarray(lp.row_upper_))).astype(np.int32)
+    if len(changed):
+        highs.changeRowsBounds(len(changed), changed, np.asarray(lp.row_lower_)[changed], np.asarray(lp.row_upper_)[changed])
+    if previous.offset_ != lp.offset_:
+        highs.changeObjectiveOffset(lp.offset_)
+
+
+def roll_independent_name(name, roll):
+    """
+    replace the roll in the index of a variable or constraint name with *,
+    e.g. nodeBalance_eq[fullYear_roll_1,west,p2020,t0002] -> nodeBalance_eq[*,west,p2020,t0002],
+    so that the same name refers to the same time step in consecutive rolls
+    """
+    return name.replace("[" + roll + ",", "[*,").replace("," + roll + ",", ",*,").replace("," + roll + "]", ",*]")
+
+
+def rename_roll(source, previous_roll, roll, destination):
+    """
+    copy a CPLEX basis or MIP start file, replacing the previous roll in the names with the current roll
+    """
+    with open(source, 'r') as source_file, open(destination, 'w') as destination_file:
+        for line in source_file:
+            destination_file.write(line.replace("[" + previous_roll + ",", "[" + roll + ",")
+                                   .replace("," + previous_roll + ",", "," + roll + ",")
+                                   .replace("," + previous_roll + "]", "," + roll + "]"))
+
+
+def absolute_db_url(input_db_url):
+    """
+    make the path of an sqlite url absolute, so that it stays valid when the run changes its working directory
+    """
+    prefix = "sqlite:///"
+    if input_db_url.startswith(prefix) and not os.path.isabs(input_db_url[len(prefix):]):
+        return prefix + os.path.abspath(input_db_url[len(prefix):])
+    return input_db_url
+
+
+def run_in_work_dir(input_db_url, scenario_name, work_dir, output_dir=None, input_workers=1, incremental=True, value_cache_dir=None,
+                    highs_in_process=False, compress_mps=False, warm_start=False, threads=None):
+    """
+    write the input and run the model of one scenario in its own work directory.
+    input/, solve_data/, output/ and the solver files are all created under the work directory,
+    so runs in different work directories do not interfere with each other.
+    :param input_db_url: database url
+    :param scenario_name: scenario to run
+    :param work_dir: directory of the run, created if it does not exist
+    :param output_dir: if given, the output of the run is copied here after the run
+    :param input_workers: number of threads writing the input files
+    :param incremental: skip rewriting unchanged input files
+    :param value_cache_dir: directory of a decoded value cache shared with other runs
+    :param highs_in_process: solve highs problems with highspy instead of the highs executable
+    :param compress_mps: write the MPS file gzip compressed
+    :param warm_start: start each roll from the basis or MIP start of the previous roll
+    :param threads: number of cores given to the run, by default all of them
+    :return: return code of the run, 0 on success
+    """
+    input_db_url = absolute_db_url(input_db_url)
+    work_dir = Path(work_dir).resolve()
+    os.makedirs(work_dir / "output", exist_ok=True)
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        runner = FlexToolRunner(input_db_url, scenario_name, root_dir=work_dir, value_cache_dir=value_cache_dir)
+        runner.highs_in_process = highs_in_process
+        runner.compress_mps = compress_mps
+        runner.warm_start = warm_start
+        runner.threads = threads
+        runner.write_input(input_db_url, scenario_name, workers=input_workers, incremental=incremental)
+        runner.run_model()
+        return_code = 0
+    except SystemExit as e:
+        return_code = e.code if isinstance(e.code, int) else 1
+    except Exception:
+        logging.exception(f"Model run of scenario {scenario_name} failed")
+        return_code = 1
+    finally:
+        os.chdir(previous_dir)
+    if output_dir is not None:
+        shutil.copytree(work_dir / "output", output_dir, dirs_exist_ok=True)
+    return return_code
+
+
+def run_parallel(runs, processes=None, threads=None):
+    """
+    run independent scenarios concurrently, each in its own process and work directory.
+    The solves and rolls within a scenario depend on each other through the files written by the previous solve,
+    so they are always run in sequence.
+    The cores are divided evenly between the scenarios running at the same time.
+    :param runs: list of dicts with the keyword arguments of run_in_work_dir
+    :param processes: number of worker processes, by default the number of cpus
+    :param threads: number of cores to divide between the worker processes, by default all of them
+    :return: list of return codes in the order of the runs
+    """
+    cores = threads or os.cpu_count() or 1
+    workers = max(1, min(processes or os.cpu_count() or 1, len(runs)))
+    runs = [dict(run, threads=run.get("threads") or max(1, cores // workers)) for run in runs]
+    return_codes = [None] * len(runs)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_in_work_dir, **run): i for i, run in enumerate(runs)}
+        for finished, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            return_codes[i] = future.result()
+            logging.info(f"Scenario {runs[i]['scenario_name']} finished with return code {return_codes[i]} ({finished}/{len(runs)})")
+    return return_codes
+
+
+def find_scenarios(input_db_url, patterns):
+    """
+    find the scenarios of the database matching the names or shell-style wildcard patterns (e.g. wind_*)
+    :return: scenario names in the order of the patterns, each once
+    """
+    with DatabaseMapping(input_db_url) as db:
+        names = [item["name"] for item in db.get_scenario_items()]
+    scenarios = []
+    for pattern in patterns:
+        matches = fnmatch.filter(names, pattern)
+        if not matches:
+            logging.error(f"No scenario in the database matches {pattern}")
+            sys.exit(-1)
+        scenarios += [name for name in matches if name not in scenarios]
+    return scenarios
+
+
+def decode_shared_values(input_db_url, cache_dir):
+    """
+    decode the parameter values of all alternatives once into a cache that the scenario runs share
+    """
+    with DatabaseMapping(input_db_url) as db:
+        value_cache = DecodedValueCache(db, input_db_url, None, cache_dir=cache_dir)
+        for param in db.get_parameter_value_items():
+            value_cache.parsed_value(param)
+    value_cache.save()
+
+
+def run_batch(input_db_url, scenario_patterns, work_dir="work", output_dir="output", processes=None, input_workers=1, incremental=True,
+              highs_in_process=False, compress_mps=False, warm_start=False, threads=None):
+    """
+    run a batch of scenarios on a pool of worker processes.
+    The database is decoded once for all scenarios, each scenario then runs in work_dir/<scenario>
+    (where the input files are kept for the next batch) and its results are copied to output_dir/<scenario>.
+    :param input_db_url: database url
+    :param scenario_patterns: scenario names or shell-style wildcard patterns
+    :param work_dir: directory for the work directories of the scenarios
+    :param output_dir: directory for the output directories of the scenarios
+    :param processes: number of scenarios run at the same time, by default the number of cpus
+    :param input_workers: number of threads writing the input files of a scenario
+    :param incremental: skip rewriting unchanged input files
+    :param highs_in_process: solve highs problems with highspy instead of the highs executable
+    :param compress_mps: write the MPS files gzip compressed
+    :param warm_start: start each roll from the basis or MIP start of the previous roll
+    :param threads: number of cores divided between the scenarios running at the same time, by default all of them
+    :return: dict of scenario names and return codes
+    """
+    input_db_url = absolute_db_url(input_db_url)
+    scenarios = find_scenarios(input_db_url, scenario_patterns)
+    value_cache_dir = os.path.abspath(os.path.join(work_dir, "cache"))
+    logging.info(f"Decoding the database for {len(scenarios)} scenarios")
+    decode_shared_values(input_db_url, value_cache_dir)
+    runs = [dict(input_db_url=input_db_url, scenario_name=name, work_dir=os.path.join(work_dir, name),
+                 output_dir=os.path.join(output_dir, name), input_workers=input_workers, incremental=incremental,
+                 value_cache_dir=value_cache_dir, highs_in_process=highs_in_process,
+                 compress_mps=compress_mps, warm_start=warm_start) for name in scenarios]
+    return dict(zip(scenarios, run_parallel(runs, processes=processes, threads=threads)))
+
+
 def main():
     logging.basicConfig(level=logging.INFO)
     logging.error("Run using run_flextool.py in the root of FlexTool")
@@ -21,7 +21,7 @@ def migrate_database(database_path):
             version = from_database(settings_parameter.default_value, settings_parameter.default_type)
 
         next_version = int(version) + 1
-        new_version = 22
+        new_version = 23
 
         while next_version <= new_version:
             if next_version == 0:
@@ -110,6 +110,8 @@ def migrate_database(database_path):
                 db.update_item("parameter_definition", entity_class_name= "connection", name= "other_operational_cost", description = "[CUR/MWh] Other operational variable cost for trasferring over the connection. Constant, Period or time.")
                 db.update_item("parameter_definition", entity_class_name= "solve", name= "solve_mode", description = "A single_solve or rolling_window for a set of rolling optimisation windows solved in a sequence.")
                 db.commit_session("Added cumulative investments")
+            elif next_version == 23:
+                add_parameters_manual(db, [["solve", "highs_threads", None, None, "Number of threads HiGHS uses in the solve. By default all the cores, or a share of them when scenarios are run in parallel."]])
             else:
                 print("Version invalid")
             next_version += 1
@@ -367,6 +369,7 @@ def get_parameter_type_list():
              ["solve", "fix_storage_periods", ("array","2d_map")],
              ["solve", "highs_method", ("str",)],
              ["solve", "highs_parallel", ("str",)],
+             ["solve", "highs_threads", ("float",)],
              ["solve", "highs_presolve", ("str",)],
              ["solve", "invest_periods", ("array","2d_map")],
              ["solve", "period_timeblockSet", ("1d_map",)],
@@ -38,12 +38,37 @@ def main():
     parser = argparse.ArgumentParser()
     parser.description = "Run flextool using the specified database URL. Return codes are 0: success, 1: infeasible or unbounded, -1: failure."
     parser.add_argument('input_db_url', help='Database URL to connect to (can be copied from Toolbox workflow db item')
-    parser.add_argument('scenario_name', help='Name for the scenario in the database that should be executed', nargs='?', default=None)
+    parser.add_argument('scenario_name', help='Name for the scenario in the database that should be executed. '
+                        'Several scenarios or wildcard patterns (e.g. "wind_*") run as a batch over a pool of processes, '
+                        'each scenario in its own work directory', nargs='*')
     parser.add_argument('--debug', action='store_true')
+    parser.add_argument('--input-workers', type=int, default=1,
+                        help='Number of threads writing the input csv files (default 1, i.e. in sequence)')
+    parser.add_argument('--rewrite-input', action='store_true',
+                        help='Rewrite all input csv files, also the ones that did not change since the previous run')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Number of scenarios run at the same time in a batch (default: number of cpus)')
+    parser.add_argument('--work-dir', default='work',
+                        help='Directory for the work directories of the scenarios in a batch (default work)')
+    parser.add_argument('--output-dir', default='output',
+                        help='The results of each scenario in a batch are copied to <output-dir>/<scenario> (default output)')
+    parser.add_argument('--highs-in-process', action='store_true',
+                        help='Solve with the highspy and swiglpk python packages instead of the highs and glpsol executables, '
+                        'skipping the MPS file and the second model generation when reading the results')
+    parser.add_argument('--compress-mps', action='store_true',
+                        help='Write the problem for highs and cplex as a gzip compressed MPS file (flextool.mps.gz), '
+                        'much smaller for large models. Needs solver binaries built with zlib')
+    parser.add_argument('--warm-start', action='store_true',
+                        help='Start each roll of a rolling solve from the basis (LP) or MIP start of the previous roll. '
+                        'Used with cplex and with --highs-in-process')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Number of cores for HiGHS (default: all). In a batch they are divided between the scenarios '
+                        'running at the same time. The highs_threads parameter of a solve overrides this')
 
     args = parser.parse_args()
     input_db_url = args.input_db_url
-    scenario_name = args.scenario_name
+    scenario_names = args.scenario_name
+    scenario_name = scenario_names[0] if scenario_names else None
     DEBUG = args.debug
 
     logging.basicConfig(
@@ -52,12 +77,28 @@ def main():
         handlers=[logging.StreamHandler(sys.stdout)]
     )
 
+    if len(scenario_names) > 1 or any(char in name for name in scenario_names for char in '*?['):
+        return_codes = flextoolrunner.run_batch(input_db_url, scenario_names, work_dir=args.work_dir, output_dir=args.output_dir,
+                                                processes=args.processes, input_workers=args.input_workers,
+                                                incremental=not args.rewrite_input, highs_in_process=args.highs_in_process,
+                                                compress_mps=args.compress_mps, warm_start=args.warm_start,
+                                                threads=args.threads)
+        failed = [name for name, return_code in return_codes.items() if return_code != 0]
+        if failed:
+            logging.error(f"Model run failed for scenarios: {', '.join(failed)}")
+            sys.exit(-1)
+        return
+
     if scenario_name:
         runner = flextoolrunner.FlexToolRunner(input_db_url, scenario_name)
-        runner.write_input(input_db_url, scenario_name)
+        runner.write_input(input_db_url, scenario_name, workers=args.input_workers, incremental=not args.rewrite_input)
     else:
         runner = flextoolrunner.FlexToolRunner(input_db_url)
-        runner.write_input(input_db_url)
+        runner.write_input(input_db_url, workers=args.input_workers, incremental=not args.rewrite_input)
+    runner.highs_in_process = args.highs_in_process
+    runner.compress_mps = args.compress_mps
+    runner.warm_start = args.warm_start
+    runner.threads = args.threads
     try:
         return_code = runner.run_model()
     except Exception as e:
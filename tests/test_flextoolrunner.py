@@ -0,0 +1,382 @@
+import inspect
+import logging
+import os
+from pathlib import Path
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from collections import OrderedDict, defaultdict
+
+sys.path.insert(0, str(Path(inspect.getfile(inspect.currentframe())).parent.parent))
+
+from flextool import flextoolrunner
+from flextool.flextoolrunner import FlexToolRunner, SolveData, Timeline
+
+HOURLY = [("t%02d" % i, "1") for i in range(8)]
+
+
+def make_runner(**attributes):
+    """FlexToolRunner without a database, with only the attributes the tested method needs."""
+    runner = FlexToolRunner.__new__(FlexToolRunner)
+    runner.logger = logging.getLogger(__name__)
+    for name, value in attributes.items():
+        setattr(runner, name, value)
+    return runner
+
+
+class AggregateTimeseriesTest(unittest.TestCase):
+    def setUp(self):
+        self._original_dir = os.getcwd()
+        self._temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self._temp_dir.name)
+        os.mkdir("input")
+        os.mkdir("solve_data")
+
+    def tearDown(self):
+        os.chdir(self._original_dir)
+        self._temp_dir.cleanup()
+
+    def _aggregate(self, old_steps, new_steps, timeseries, method, data):
+        with open(os.path.join("input", timeseries), "w") as input_file:
+            input_file.write(data)
+        timelines = {"y": old_steps, "y_2h": new_steps}
+        runner = make_runner(
+            timelines=timelines,
+            original_timeline={"y_2h": "y"},
+            indexed_timelines={name: Timeline(steps) for name, steps in timelines.items()},
+        )
+        runner.aggregate_timeseries(timeseries, method, "y_2h")
+        with open(os.path.join("solve_data", timeseries), newline="") as output_file:
+            return output_file.read().splitlines()
+
+    def test_sum_of_each_entity(self):
+        old_steps = [("t" + str(i), "1") for i in range(1, 7)]
+        new_steps = [("t1", "2.0"), ("t3", "2.0"), ("t5", "2.0")]
+        data = "node,time,pt_node_inflow\n" + "".join(f"n1,t{i},{i}\n" for i in range(1, 7)) \
+            + "".join(f"n2,t{i},{10 * i}\n" for i in range(1, 7))
+        rows = self._aggregate(old_steps, new_steps, "pt_node_inflow.csv", "sum", data)
+        self.assertEqual(rows, ["node,time,pt_node_inflow",
+                                "n1,t1,3.0", "n1,t3,7.0", "n1,t5,11.0",
+                                "n2,t1,30.0", "n2,t3,70.0", "n2,t5,110.0"])
+
+    def test_average(self):
+        old_steps = [("t" + str(i), "1") for i in range(1, 7)]
+        new_steps = [("t1", "2.0"), ("t3", "2.0"), ("t5", "2.0")]
+        data = "profile,time,pt_profile\n" + "".join(f"pr,t{i},0.{i}\n" for i in range(1, 7))
+        rows = self._aggregate(old_steps, new_steps, "pt_profile.csv", "average", data)
+        self.assertEqual(rows, ["profile,time,pt_profile", "pr,t1,0.15", "pr,t3,0.35", "pr,t5,0.55"])
+
+    def test_storage_state_reference_value_moves_to_previous_new_step(self):
+        old_steps = [("t" + str(i), "1") for i in range(1, 7)]
+        new_steps = [("t1", "2.0"), ("t3", "2.0"), ("t5", "2.0")]
+        data = "node,nodeParam,time,pt_node\n" \
+               "n1,storage_state_reference_value,t2,5\n" \
+               "n1,storage_state_reference_value,t3,7\n" \
+            + "".join(f"n1,self_discharge_loss,t{i},{i}\n" for i in range(1, 7))
+        rows = self._aggregate(old_steps, new_steps, "pt_node.csv", "average", data)
+        self.assertEqual(rows, ["node,nodeParam,time,pt_node",
+                                "n1,storage_state_reference_value,t1,5",
+                                "n1,storage_state_reference_value,t3,7.0",
+                                "n1,self_discharge_loss,t1,1.5",
+                                "n1,self_discharge_loss,t3,3.5",
+                                "n1,self_discharge_loss,t5,5.5"])
+
+    def test_irregular_step_durations_are_covered_by_hours(self):
+        """A new step covers the original steps within its duration, not a fixed number of rows."""
+        old_steps = [("t1", "1"), ("t2", "1"), ("t3", "2"), ("t4", "1"), ("t5", "1")]
+        new_steps = [("t1", "2.0"), ("t3", "2.0"), ("t4", "2.0")]
+        data = "node,time,pt_node_inflow\n" + "".join(f"n1,t{i},{i}\n" for i in range(1, 6))
+        rows = self._aggregate(old_steps, new_steps, "pt_node_inflow.csv", "sum", data)
+        self.assertEqual(rows, ["node,time,pt_node_inflow", "n1,t1,3.0", "n1,t3,3.0", "n1,t4,9.0"])
+
+    def test_missing_timestep_stops_the_run(self):
+        old_steps = [("t" + str(i), "1") for i in range(1, 5)]
+        new_steps = [("t1", "2.0"), ("t3", "2.0")]
+        data = "node,time,pt_node_inflow\nn1,t1,1\nn1,t3,3\nn1,t4,4\n"
+        with self.assertLogs(__name__, level="ERROR"), self.assertRaises(SystemExit):
+            self._aggregate(old_steps, new_steps, "pt_node_inflow.csv", "sum", data)
+
+
+def active_time(period_durations):
+    """active time list of periods with the given step durations, the step indexes run over all periods"""
+    active_time_list = OrderedDict()
+    index = 0
+    for period, durations in period_durations:
+        active_time_list[period] = []
+        for duration in durations:
+            active_time_list[period].append(("t%02d" % index, index, str(duration)))
+            index += 1
+    return active_time_list
+
+
+def step_names(time_list):
+    return {period: [step[0] for step in steps] for period, steps in time_list.items()}
+
+
+class CreateRollingSolvesTest(unittest.TestCase):
+    def _rolls(self, active_time_list, jump, horizon, start=None, duration=-1):
+        runner = make_runner(roll_counter={"dispatch": 0})
+        return [(name, step_names(active), step_names(realized)) for name, active, realized
+                in runner.create_rolling_solves("dispatch", active_time_list, jump, horizon, start, duration)]
+
+    def test_horizon_beyond_the_end_is_cut_at_the_last_step(self):
+        rolls = self._rolls(active_time([("p", [1] * 6)]), 2, 4)
+        self.assertEqual(rolls, [
+            ("dispatch_roll_0", {"p": ["t00", "t01", "t02", "t03"]}, {"p": ["t00", "t01"]}),
+            ("dispatch_roll_1", {"p": ["t02", "t03", "t04", "t05"]}, {"p": ["t02", "t03"]}),
+            ("dispatch_roll_2", {"p": ["t04", "t05"]}, {"p": ["t04", "t05"]}),
+        ])
+
+    def test_roll_ending_at_the_end_of_the_timeline(self):
+        rolls = self._rolls(active_time([("p", [1] * 5)]), 2, 3)
+        self.assertEqual(rolls, [
+            ("dispatch_roll_0", {"p": ["t00", "t01", "t02"]}, {"p": ["t00", "t01"]}),
+            ("dispatch_roll_1", {"p": ["t02", "t03", "t04"]}, {"p": ["t02", "t03"]}),
+            ("dispatch_roll_2", {"p": ["t04"]}, {"p": ["t04"]}),
+        ])
+
+    def test_irregular_step_durations(self):
+        """Rolls start at the first step that starts after the jumped hours."""
+        rolls = self._rolls(active_time([("p", [1, 1, 2, 1, 1, 2, 1])]), 2, 3)
+        self.assertEqual(rolls, [
+            ("dispatch_roll_0", {"p": ["t00", "t01", "t02"]}, {"p": ["t00", "t01"]}),
+            ("dispatch_roll_1", {"p": ["t02", "t03"]}, {"p": ["t02"]}),
+            ("dispatch_roll_2", {"p": ["t03", "t04", "t05"]}, {"p": ["t03", "t04"]}),
+            ("dispatch_roll_3", {"p": ["t05", "t06"]}, {"p": ["t05"]}),
+            ("dispatch_roll_4", {"p": ["t06"]}, {"p": ["t06"]}),
+        ])
+
+    def test_roll_over_two_periods(self):
+        rolls = self._rolls(active_time([("p1", [1] * 3), ("p2", [1] * 3)]), 2, 3)
+        self.assertEqual(rolls, [
+            ("dispatch_roll_0", {"p1": ["t00", "t01", "t02"]}, {"p1": ["t00", "t01"]}),
+            ("dispatch_roll_1", {"p1": ["t02"], "p2": ["t03", "t04"]}, {"p1": ["t02"], "p2": ["t03"]}),
+            ("dispatch_roll_2", {"p2": ["t04", "t05"]}, {"p2": ["t04", "t05"]}),
+        ])
+
+    def test_start_and_duration(self):
+        rolls = self._rolls(active_time([("p", [1] * 8)]), 2, 3, start=["p", "t02"], duration=4)
+        self.assertEqual(rolls, [
+            ("dispatch_roll_0", {"p": ["t02", "t03", "t04"]}, {"p": ["t02", "t03"]}),
+            ("dispatch_roll_1", {"p": ["t04", "t05"]}, {"p": ["t04", "t05"]}),
+        ])
+
+    def test_roll_names_continue_the_counter(self):
+        runner = make_runner(roll_counter={"dispatch": 3})
+        names = [name for name, _, _ in runner.create_rolling_solves("dispatch", active_time([("p", [1] * 4)]), 2, 2)]
+        self.assertEqual(names, ["dispatch_roll_3", "dispatch_roll_4"])
+
+    def test_missing_start_stops_the_run(self):
+        with self.assertLogs(__name__, level="ERROR"), self.assertRaises(SystemExit):
+            self._rolls(active_time([("p", [1] * 4)]), 2, 2, start=["p", "t99"])
+
+
+def step_indexes(period_indexes):
+    """active time list of periods with the given indexes of hourly steps in the timeline"""
+    return OrderedDict((period, [("t%02d" % index, index, "1") for index in indexes])
+                       for period, indexes in period_indexes)
+
+
+class MakeStepJumpTest(unittest.TestCase):
+    def test_jump_over_a_gap_between_blocks(self):
+        active_time_list = step_indexes([("p", [0, 1, 2, 5, 6])])
+        step_lengths = make_runner().make_step_jump(active_time_list, [("p", "p")], [("p", "p")])
+        self.assertEqual(step_lengths, [
+            ("p", "t00", "t06", "t02", "p", "t06", -6),
+            ("p", "t01", "t00", "t00", "p", "t00", 1),
+            ("p", "t02", "t01", "t01", "p", "t01", 1),
+            ("p", "t05", "t02", "t06", "p", "t02", 3),
+            ("p", "t06", "t05", "t05", "p", "t05", 1),
+        ])
+
+    def test_first_step_of_a_period_jumps_from_the_previous_period(self):
+        active_time_list = step_indexes([("p1", [0, 1, 2]), ("p2", [0, 1, 2])])
+        period__branch = [("p1", "p1"), ("p2", "p2")]
+        step_lengths = make_runner().make_step_jump(active_time_list, period__branch, period__branch)
+        self.assertEqual(step_lengths, [
+            ("p1", "t00", "t02", "t02", "p2", "t02", -2),
+            ("p1", "t01", "t00", "t00", "p1", "t00", 1),
+            ("p1", "t02", "t01", "t01", "p1", "t01", 1),
+            ("p2", "t00", "t02", "t02", "p1", "t02", -2),
+            ("p2", "t01", "t00", "t00", "p2", "t00", 1),
+            ("p2", "t02", "t01", "t01", "p2", "t01", 1),
+        ])
+
+    def test_branches(self):
+        """A branch of the realized period wraps within itself, a continuing branch jumps from its previous period."""
+        active_time_list = step_indexes([("p1", [0, 1]), ("p1_b1", [0, 1]), ("p2_b1", [2, 3])])
+        period__branch = [("p1", "p1"), ("p1", "p1_b1"), ("p2", "p2_b1")]
+        solve_branch__time_branch = [("p1_b1", "b1"), ("p2_b1", "b1"), ("p1", "p1")]
+        step_lengths = make_runner().make_step_jump(active_time_list, period__branch, solve_branch__time_branch)
+        self.assertEqual(step_lengths, [
+            ("p1", "t00", "t01", "t01", "p2_b1", "t03", -3),
+            ("p1", "t01", "t00", "t00", "p1", "t00", 1),
+            ("p1_b1", "t00", "t01", "t01", "p1_b1", "t01", -1),
+            ("p1_b1", "t01", "t00", "t00", "p1_b1", "t00", 1),
+            ("p2_b1", "t02", "t03", "t03", "p1_b1", "t01", 1),
+            ("p2_b1", "t03", "t02", "t02", "p2_b1", "t02", 1),
+        ])
+
+
+class WriteTimelineMatchingMapTest(unittest.TestCase):
+    def setUp(self):
+        self._original_dir = os.getcwd()
+        self._temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self._temp_dir.name)
+        os.mkdir("solve_data")
+
+    def tearDown(self):
+        os.chdir(self._original_dir)
+        self._temp_dir.cleanup()
+
+    def _matching_map(self, timelines, upper_timeline, upper_steps, lower_active_time_list, period__branch):
+        runner = make_runner(
+            timeblocks_used_by_solves={"upper": [("p", "upper_block")], "lower": [("p", "lower_block")]},
+            timeblocks__timeline={"upper_block": [upper_timeline], "lower_block": ["y"]},
+            indexed_timelines={name: Timeline(steps) for name, steps in timelines.items()},
+            solve_data=SolveData(),
+        )
+        upper_active_time_list = {"p": [(step, 0, "1") for step in upper_steps]}
+        runner.write_timeline_matching_map(upper_active_time_list, lower_active_time_list, "upper", "lower", period__branch)
+        runner.solve_data.write()
+        with open("solve_data/timeline_matching_map.csv") as map_file:
+            return map_file.read().splitlines()
+
+    def test_aggregated_upper_level(self):
+        timelines = {"y": HOURLY, "y_2h": [("t%02d" % i, "2") for i in range(0, 8, 2)]}
+        rows = self._matching_map(timelines, "y_2h", ["t00", "t02", "t04", "t06"], step_indexes([("p", range(8))]), [("p", "p")])
+        self.assertEqual(rows, ["period,step,upper_step",
+                                "p,t00,t00", "p,t01,t00", "p,t02,t02", "p,t03,t02",
+                                "p,t04,t04", "p,t05,t04", "p,t06,t06", "p,t07,t06"])
+
+    def test_late_starting_upper_level(self):
+        """Steps before the first upper step map to the first upper step."""
+        rows = self._matching_map({"y": HOURLY}, "y", ["t03", "t05"], step_indexes([("p", range(8))]), [("p", "p")])
+        self.assertEqual(rows, ["period,step,upper_step",
+                                "p,t00,t03", "p,t01,t03", "p,t02,t03", "p,t03,t03",
+                                "p,t04,t03", "p,t05,t05", "p,t06,t05", "p,t07,t05"])
+
+    def test_irregular_upper_step_durations(self):
+        timelines = {"y": HOURLY, "y_irregular": [("t00", "3"), ("t03", "1"), ("t04", "4")]}
+        rows = self._matching_map(timelines, "y_irregular", ["t00", "t03", "t04"], step_indexes([("p", range(8))]), [("p", "p")])
+        self.assertEqual(rows, ["period,step,upper_step",
+                                "p,t00,t00", "p,t01,t00", "p,t02,t00", "p,t03,t03",
+                                "p,t04,t04", "p,t05,t04", "p,t06,t04", "p,t07,t04"])
+
+    def test_branch_uses_the_upper_steps_of_its_period(self):
+        timelines = {"y": HOURLY, "y_2h": [("t%02d" % i, "2") for i in range(0, 8, 2)]}
+        lower_active_time_list = step_indexes([("p", [0, 1, 2]), ("p_b1", [3, 4, 5])])
+        rows = self._matching_map(timelines, "y_2h", ["t00", "t02", "t04", "t06"], lower_active_time_list,
+                                  [("p", "p"), ("p", "p_b1")])
+        self.assertEqual(rows, ["period,step,upper_step",
+                                "p,t00,t00", "p,t01,t00", "p,t02,t02",
+                                "p_b1,t03,t02", "p_b1,t04,t04", "p_b1,t05,t04"])
+
+
+class StochasticBranchesTest(unittest.TestCase):
+    #rows of the stochastic_branches parameter: period, branch, start_time, realized, weight
+    branches = [("p1", "p1", "t00", "yes", "1"), ("p1", "b1", "t00", "no", "1"), ("p1", "b0", "t00", "no", "0")]
+
+    def _create(self, info, active_time_list, realized_time_list):
+        runner = make_runner(stochastic_timesteps=defaultdict(list))
+        period__branch, solve_branch__time_branch, active_time_lists, _, realized_time_lists, branch_start_time = \
+            runner.create_stochastic_periods({"dispatch": info}, ["dispatch"], {"dispatch": "dispatch"},
+                                             {"dispatch": active_time_list}, {"dispatch": realized_time_list})
+        return (period__branch["dispatch"], solve_branch__time_branch["dispatch"], step_names(active_time_lists["dispatch"]),
+                step_names(realized_time_lists["dispatch"]), branch_start_time["dispatch"], runner.stochastic_timesteps["dispatch"])
+
+    def test_index_stochastic_branches(self):
+        start_times, realized_branches, realized_start_times = FlexToolRunner.index_stochastic_branches(
+            self.branches + [("p2", "p2", "t02", "yes", "1")])
+        self.assertEqual({period: dict(branches) for period, branches in start_times.items()}, {
+            "p1": {"t00": [("p1", "1", "yes"), ("b1", "1", "no"), ("b0", "0", "no")]},
+            "p2": {"t02": [("p2", "1", "yes")]},
+        })
+        self.assertEqual(dict(realized_branches), {("p1", "t00"): ["p1"], ("p2", "t02"): ["p2"]})
+        self.assertEqual(realized_start_times, {"t00", "t02"})
+
+    def test_period_without_realized_branch_continues_the_branches(self):
+        """A period after the branching has no branch rows, its realized branch is the one realized at the branch start."""
+        period__branch, solve_branch__time_branch, active, realized, branch_start_time, stochastic_timesteps = self._create(
+            self.branches, step_indexes([("p1", [0, 1]), ("p2", [2, 3])]), step_indexes([("p1", [0, 1]), ("p2", [2, 3])]))
+        self.assertEqual(period__branch, [("p1", "p1"), ("p1", "p1_p1"), ("p1", "p1_b1"), ("p1", "p1_b0"),
+                                          ("p2", "p2_p1"), ("p2", "p2_b1"), ("p2", "p2_b0")])
+        self.assertEqual(solve_branch__time_branch, [("p1_b1", "b1"), ("p2_p1", "p1"), ("p2_b1", "b1"), ("p2_b0", "b0"),
+                                                     ("p1", "p1"), ("p2", "p1")])
+        self.assertEqual(active, {"p1": ["t00", "t01"], "p1_b1": ["t00", "t01"]})
+        self.assertEqual(realized, {"p1": ["t00", "t01"]})
+        self.assertEqual(branch_start_time, ("p1", "t00"))
+        self.assertEqual(stochastic_timesteps, [("p1_p1", "t00"), ("p1_p1", "t01"), ("p1_b1", "t00"), ("p1_b1", "t01"),
+                                                ("p1_b0", "t00"), ("p1_b0", "t01"), ("p2_p1", "t02"), ("p2_p1", "t03"),
+                                                ("p2_b1", "t02"), ("p2_b1", "t03"), ("p2_b0", "t02"), ("p2_b0", "t03")])
+
+    def test_no_stochastic_branches(self):
+        period__branch, solve_branch__time_branch, active, realized, branch_start_time, stochastic_timesteps = self._create(
+            [], step_indexes([("p1", [0, 1]), ("p2", [2, 3])]), step_indexes([("p1", [0, 1]), ("p2", [2, 3])]))
+        self.assertEqual(period__branch, [("p1", "p1"), ("p2", "p2")])
+        self.assertEqual(solve_branch__time_branch, [])
+        self.assertEqual(active, {"p1": ["t00", "t01"], "p2": ["t02", "t03"]})
+        self.assertEqual(realized, {"p1": ["t00", "t01"], "p2": ["t02", "t03"]})
+        self.assertIsNone(branch_start_time)
+        self.assertEqual(stochastic_timesteps, [])
+
+    def test_two_realized_branches_stop_the_run(self):
+        info = self.branches + [("p1", "b2", "t00", "yes", "1")]
+        with self.assertLogs(__name__, level="ERROR"), self.assertRaises(SystemExit):
+            self._create(info, step_indexes([("p1", [0, 1])]), step_indexes([("p1", [0, 1])]))
+
+    def test_start_without_realized_branch_stops_the_run(self):
+        with self.assertLogs(__name__, level="ERROR"), self.assertRaises(SystemExit):
+            self._create([("p1", "b1", "t00", "no", "1")], step_indexes([("p1", [0, 1])]), step_indexes([("p1", [0, 1])]))
+
+
+@unittest.skipIf(flextoolrunner.highspy is None, "highspy and swiglpk are needed to solve in process")
+class ModelRunHighspyTest(unittest.TestCase):
+    model = """
+param datetime0 := gmtime();
+var x >= 0;
+minimize cost: x;
+s.t. lower_limit: x >= 2;
+printf "Checking: x has a lower limit\\n";
+param setup1 := gmtime() - datetime0;
+display setup1;
+solve;
+printf "x = %g\\n", x;
+param w_solve := gmtime() - datetime0 - setup1;
+display w_solve;
+end;
+"""
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._root = Path(self._temp_dir.name)
+        (self._root / "model.mod").write_text(self.model)
+        (self._root / "model.dat").write_text("data;\nend;\n")
+        (self._root / "highs.opt").write_text("")
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_gmpl_output_is_echoed(self):
+        runner = make_runner(root_dir=self._root, flextool_dir=Path(flextoolrunner.__file__).parent,
+                             highs_models={}, highs_threads={}, threads=1, highs_scheduler_threads=None,
+                             highs_presolve={}, highs_method={}, highs_parallel={}, warm_start=False,
+                             profile=[], profile_solve="solve")
+        result = {}
+        output = StringIO()
+        with redirect_stdout(output):
+            return_code = runner.model_run_highspy("solve", "solve", str(self._root / "model.mod"), str(self._root / "model.dat"),
+                                                   str(self._root / "highs.opt"), str(self._root / "solution.txt"), result)
+        self.assertEqual(return_code, 0)
+        self.assertIn("Checking: x has a lower limit\n", output.getvalue())
+        self.assertIn("x = 2\n", output.getvalue())
+        self.assertFalse((self._root / "glpsol_output.txt").exists())
+        timings = {(row["phase"], row["metric"]) for row in runner.profile}
+        self.assertIn(("generate_model", "gmpl_setup1"), timings)
+        self.assertIn(("read_results", "gmpl_w_solve"), timings)
+
+
+if __name__ == "__main__":
+    unittest.main()